@@ -0,0 +1,151 @@
+import calendar
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import DailySales
+
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+SALES_REPORT_CACHE_TIMEOUT = getattr(settings, 'SALES_REPORT_CACHE_TIMEOUT', 60 * 5)
+# a year of days, ten years of months
+SALES_REPORT_MAX_PERIODS = getattr(settings, 'SALES_REPORT_MAX_PERIODS', 400)
+SALES_VERSION_KEY = 'food:sales:version'
+# gallery rows carry no menu category
+GALLERY_CATEGORY = 'gallery'
+
+
+def period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def period_end(start, granularity):
+    if granularity == 'week':
+        # the last week of the calendar is cut short at date.max
+        return start + timedelta(days=min(6, (date.max - start).days))
+    if granularity == 'month':
+        return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start
+
+
+def period_count(start, end, granularity):
+    """Number of periods sales_report returns for the range, without building them."""
+    if granularity == 'week':
+        return (period_start(end, 'week') - period_start(start, 'week')).days // 7 + 1
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days + 1
+
+
+def _sales_version():
+    # like the catalog versions: seeded from the clock so a lost counter never repeats
+    version = cache.get(SALES_VERSION_KEY)
+    if version is None:
+        cache.add(SALES_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SALES_VERSION_KEY, time.time_ns())
+    return version
+
+
+def _period_key(granularity, start, version):
+    return f'food:sales:{version}:{granularity}:{start.isoformat()}'
+
+
+def invalidate_sales_days(days):
+    """Drop the cached day, week and month containing each of ``days``.
+
+    Only needed for days already over: a cart ordered on an earlier day and
+    paid today is added to that day's rollup row.
+    """
+    today = timezone.localdate()
+    version = _sales_version()
+    cache.delete_many([
+        _period_key(granularity, period_start(day, granularity), version)
+        for day in set(days) if day < today
+        for granularity in GRANULARITIES
+    ])
+
+
+def invalidate_sales_report():
+    cache.set(SALES_VERSION_KEY, max(time.time_ns(), _sales_version() + 1), None)
+
+
+def _query(spans, granularity):
+    days = Q()
+    for start, end in spans:
+        days |= Q(day__range=(start, end))
+    rows = DailySales.objects.filter(days).annotate(
+        period=GRANULARITIES[granularity]('day'),
+    ).values('period', 'category').annotate(
+        quantity=Sum('quantity'),
+        revenue=Sum('revenue'),
+    ).order_by()
+    totals = {}
+    for row in rows:
+        category = row['category'] or GALLERY_CATEGORY
+        quantity, revenue = totals.setdefault(row['period'], {}).get(category, (0, Decimal(0)))
+        totals[row['period']][category] = (quantity + row['quantity'], revenue + row['revenue'])
+    return totals
+
+
+def sales_report(start, end, granularity='day'):
+    """Revenue and quantity per period and category between two dates, inclusive.
+
+    Returns [(period_start, {category: (quantity, revenue)})] oldest first.
+    Periods that ended before today and lie wholly inside the range are
+    cached, as the rollup never changes for them again (see
+    invalidate_sales_days for the one exception); everything else is
+    aggregated in a single query over the DailySales rollup. That exception
+    only reaches the cache of the process settling the late cart, so with a
+    per-process cache keep SALES_REPORT_CACHE_TIMEOUT short.
+
+    Raises ValueError for ranges of more than SALES_REPORT_MAX_PERIODS periods.
+    """
+    if period_count(start, end, granularity) > SALES_REPORT_MAX_PERIODS:
+        raise ValueError(f"At most {SALES_REPORT_MAX_PERIODS} periods per report.")
+    today = timezone.localdate()
+    version = _sales_version()
+    periods = []
+    cacheable = {}
+    day = period_start(start, granularity)
+    while day <= end:
+        last = period_end(day, granularity)
+        periods.append((day, max(day, start), min(last, end)))
+        if day >= start and last <= end and last < today:
+            cacheable[_period_key(granularity, day, version)] = day
+        if last >= end:
+            break
+        day = last + timedelta(days=1)
+
+    results = {cacheable[key]: value for key, value in cache.get_many(list(cacheable)).items()}
+    missing = [(day, lo, hi) for day, lo, hi in periods if day not in results]
+    if missing:
+        # neighbouring missing periods merge into one day range, usually leaving
+        # a partial first period and the current one
+        spans = []
+        for _, lo, hi in missing:
+            if spans and spans[-1][1] + timedelta(days=1) == lo:
+                spans[-1][1] = hi
+            else:
+                spans.append([lo, hi])
+        fresh = _query(spans, granularity)
+        for day, _, _ in missing:
+            results[day] = fresh.get(day, {})
+        computed = {day for day, _, _ in missing}
+        cache.set_many({
+            key: results[day] for key, day in cacheable.items() if day in computed
+        }, SALES_REPORT_CACHE_TIMEOUT)
+    return [(day, results[day]) for day, _, _ in periods]
@@ -0,0 +1,370 @@
+import math
+import statistics
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Callable, Optional, Union
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.http import QueryDict
+from django.template import Engine, RequestContext, engines
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .catalog import invalidate_gallery, invalidate_menu
+from .models import ContactMessage, CustomUser, FeedBack, FoodItem, Gallery, Order, Payments
+from .pagination import KeysetPage
+from .urls import app_name, urlpatterns
+
+
+@dataclass
+class Route:
+    """How to hit one named route: who is logged in, the method and its arguments.
+
+    ``kwargs`` is called before every request, so routes that consume an
+    object (delete, mark done) get a fresh one each time. ``data`` may be a
+    callable taking the fixtures too. ``view`` names the URL when it differs
+    from the route's key, so one view can be benchmarked with several methods.
+    """
+    role: Optional[str] = None
+    method: str = 'get'
+    kwargs: Callable = lambda fixtures: {}
+    data: Union[dict, Callable] = field(default_factory=dict)
+    view: Optional[str] = None
+
+
+ROUTES = {
+    'main': Route(),
+    'about_page': Route(),
+    'contact': Route(),
+    'login': Route(),
+    'register': Route(),
+    'order_success': Route(),
+    'admin_dashboard': Route(role='admin'),
+    'add_food': Route(role='admin'),
+    'add_gallery': Route(role='admin'),
+    'export_data': Route(role='admin', kwargs=lambda f: {'kind': 'orders'}),
+    'edit_food': Route(role='admin', kwargs=lambda f: {'food_id': f.food_item.id}),
+    'delete_food': Route(role='admin', method='post', kwargs=lambda f: {'food_id': f.new_food_item().id}),
+    'delete_gallery': Route(role='admin', method='post', kwargs=lambda f: {'id': f.new_gallery_item().id}),
+    'mark_done': Route(role='admin', method='post', kwargs=lambda f: {'order_id': f.new_order().id}),
+    'mark_order_completed': Route(role='admin', method='post', kwargs=lambda f: {'order_id': f.new_order().id}),
+    'mark_gallery_done': Route(role='admin', method='post',
+                               kwargs=lambda f: {'order_id': f.new_gallery_order().id}),
+    'complete_orders': Route(role='admin', method='post',
+                             data=lambda f: {'ids': [f.new_order().id, f.new_gallery_order().id]}),
+    'order_page': Route(role='user', kwargs=lambda f: {'item_id': f.food_item.id}),
+    'gallery_order': Route(role='user', kwargs=lambda f: {'item_id': f.gallery_item.id}),
+    'checkout': Route(role='user'),
+    'payment': Route(role='user'),
+    # the one hot write path: settling a cart of several distinct items
+    'settle_payment': Route(role='user', method='post', view='payment', data=lambda f: f.new_cart()),
+    'feedback': Route(role='user'),
+    'api_menu': Route(),
+    'api_gallery': Route(),
+    'api_search': Route(data={'q': 'paneer masala'}),
+    'api_ratings': Route(role='user'),
+    'order_feed': Route(role='admin', data={'timeout': 0}),
+    'sales_report': Route(role='admin', data={'granularity': 'week'}),
+}
+
+
+# most distinct menu items in the cart settled by the settle_payment route;
+# the cart takes the first ones of the seeded menu, so it grows with the data
+CART_ITEMS = 25
+
+
+class Fixtures:
+    """Users and rows the benchmarked requests need, created inside the rolled back transaction."""
+
+    def __init__(self):
+        self.admin = CustomUser.objects.create_user(
+            'benchmark_admin', 'benchmark_admin@example.com', 'benchmark', user_type='admin',
+        )
+        self.user = CustomUser.objects.create_user('benchmark_user', 'benchmark_user@example.com', 'benchmark')
+        self.food_item = FoodItem.objects.first() or self.new_food_item()
+        self.gallery_item = Gallery.objects.first() or self.new_gallery_item()
+        # a pending cart so checkout and payment render instead of redirecting
+        Order.objects.create(user=self.user, item=self.food_item, quantity=2)
+        Order.objects.create(user=self.user, gallery_item=self.gallery_item, quantity=1)
+
+    def new_food_item(self):
+        return FoodItem.objects.create(name='Benchmark Dish', category='veg', price=100,
+                                       image='food_images/placeholder.jpg')
+
+    def new_gallery_item(self):
+        return Gallery.objects.create(caption='Benchmark Image', price=100, image='gallery/placeholder.jpg')
+
+    def new_order(self):
+        return Order.objects.create(user=self.user, item=self.food_item)
+
+    def new_gallery_order(self):
+        return Order.objects.create(user=self.user, gallery_item=self.gallery_item)
+
+    def new_cart(self):
+        """Fill the user's cart with several menu items and a gallery entry, return the payment form."""
+        for item in FoodItem.objects.order_by('id')[:CART_ITEMS]:
+            Order.objects.create(user=self.user, item=item, quantity=2)
+        self.new_gallery_order()
+        return {
+            'first_name': 'Bench', 'last_name': 'Mark', 'address': '1 Benchmark Road', 'country': 'India',
+            'state': 'Tamil Nadu', 'pin_code': '600001', 'payment_method': 'upi',
+        }
+
+
+def missing_routes():
+    return sorted({pattern.name for pattern in urlpatterns} - {route.view or name for name, route in ROUTES.items()})
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _summarise(route, timings, query_counts, status):
+    timings_ms = [t * 1000 for t in timings]
+    return {
+        'method': route.method.upper(),
+        'role': route.role or 'anonymous',
+        'status': status,
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p90_ms': round(percentile(timings_ms, 90), 3),
+        'p99_ms': round(percentile(timings_ms, 99), 3),
+        'mean_ms': round(statistics.fmean(timings_ms), 3),
+        'max_ms': round(max(timings_ms), 3),
+        'queries_min': min(query_counts),
+        'queries_max': max(query_counts),
+    }
+
+
+def run_benchmarks(iterations=20, warmup=2, names=None):
+    """Time every route through the test client and roll all writes back afterwards."""
+    results = {}
+    with transaction.atomic():
+        fixtures = Fixtures()
+        clients = {None: Client(), 'user': Client(), 'admin': Client()}
+        clients['user'].force_login(fixtures.user)
+        clients['admin'].force_login(fixtures.admin)
+
+        for name in names or sorted(ROUTES):
+            route = ROUTES[name]
+            client = clients[route.role]
+            timings, query_counts, status = [], [], None
+            for run in range(warmup + iterations):
+                url = reverse(f"{app_name}:{route.view or name}", kwargs=route.kwargs(fixtures))
+                request = getattr(client, route.method)
+                data = route.data(fixtures) if callable(route.data) else route.data
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = request(url, data)
+                    if response.streaming:
+                        # streamed bodies only run their queries while being consumed
+                        b''.join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                if run >= warmup:
+                    timings.append(elapsed)
+                    query_counts.append(len(queries))
+                    status = response.status_code
+            results[name] = _summarise(route, timings, query_counts, status)
+        transaction.set_rollback(True)
+    # the catalog cache may now hold rows that were just rolled back
+    invalidate_menu()
+    invalidate_gallery()
+    return results
+
+
+TEMPLATE_MODES = (
+    # label, use the configured (cached) loader, keep the header/footer fragments cached
+    ('uncached loader', False, False),
+    ('cached loader', True, False),
+    ('cached loader + fragments', True, True),
+)
+
+
+def _uncached_engine(engine):
+    """A copy of ``engine`` that reads and compiles every template on each lookup."""
+    return Engine(
+        dirs=engine.dirs,
+        context_processors=engine.context_processors,
+        debug=engine.debug,
+        loaders=['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader'],
+        string_if_invalid=engine.string_if_invalid,
+        file_charset=engine.file_charset,
+        libraries=engine.libraries,
+        autoescape=engine.autoescape,
+    )
+
+
+def _page(rows, param):
+    return KeysetPage(rows, QueryDict(mutable=True), param, None, rows[-1].id if rows else None)
+
+
+def template_contexts(size):
+    """Unsaved rows for main.html and admin_dashboard.html, ``size`` of each, so rendering runs no SQL."""
+    now = timezone.now()
+    factory = RequestFactory()
+    admin = CustomUser(id=1, username='benchmark_admin', user_type='admin')
+    customer = CustomUser(id=2, username='benchmark_user')
+    food = [
+        FoodItem(id=n, name=f"Benchmark Dish {n}", category='veg', price=Decimal('149.00'),
+                 description="Slow cooked, freshly spiced and served hot. " * 3,
+                 image='food_images/placeholder.jpg', created_at=now)
+        for n in range(1, size + 1)
+    ]
+    gallery = [
+        Gallery(id=n, caption=f"Benchmark Image {n}", price=Decimal('99.00'),
+                image='gallery/placeholder.jpg', created_at=now)
+        for n in range(1, size + 1)
+    ]
+    orders = [
+        Order(id=n, user=customer, item=food[n - 1], quantity=2, ordered_at=now,
+              status='Pending' if n % 2 else 'Completed')
+        for n in range(1, size + 1)
+    ]
+    gallery_orders = [
+        Order(id=size + n, user=customer, gallery_item=gallery[n - 1], quantity=1, ordered_at=now,
+              status='Pending' if n % 2 else 'Completed')
+        for n in range(1, size + 1)
+    ]
+    contact_messages = [
+        ContactMessage(id=n, name=f"Guest {n}", email=f"guest{n}@example.com", subject="Table booking",
+                       message="Do you have a table for four tonight?", sent_at=now)
+        for n in range(1, size + 1)
+    ]
+    payments = [
+        Payments(id=n, user=customer, first_name='Benchmark', last_name=f"User{n}", address='1 Street',
+                 country='India', state='Tamil Nadu', pin_code='600001', payment_method='UPI',
+                 amount=Decimal('298.00'), created_at=now)
+        for n in range(1, size + 1)
+    ]
+    feedbacks = [
+        FeedBack(id=n, user=customer, message="Lovely food.", rating=5, created_at=now)
+        for n in range(1, size + 1)
+    ]
+
+    main_request = factory.get('/')
+    main_request.user = AnonymousUser()
+    dashboard_request = factory.get('/admin_dashboard/')
+    dashboard_request.user = admin
+    return {
+        'food/main.html': (main_request, {'food_items': food, 'gallery_images': gallery}),
+        'food/admin_dashboard.html': (dashboard_request, {
+            'food_items': _page(food, 'food_page'),
+            'orders': _page(orders, 'orders_page'),
+            'gallery_orders': _page(gallery_orders, 'gallery_orders_page'),
+            'messages': _page(contact_messages, 'messages_page'),
+            'gallery_images': _page(gallery, 'gallery_page'),
+            'payments': _page(payments, 'payments_page'),
+            'feedbacks': _page(feedbacks, 'feedbacks_page'),
+            'total_users': size,
+            'total_food_orders': size,
+            'total_gallery_orders': size,
+            'total_revenue': Decimal('298.00') * size,
+            'rejected_logins': {'ip': 0, 'username': 0},
+        }),
+    }
+
+
+def _drop_fragments(user):
+    cache.delete_many([
+        make_template_fragment_key('site_header', [user.is_authenticated, getattr(user, 'user_type', '')]),
+        make_template_fragment_key('site_footer'),
+    ])
+
+
+def run_template_benchmarks(iterations=50, warmup=3, size=200):
+    """Time rendering the largest pages with and without the cached loader and fragment cache."""
+    cached = engines['django'].engine
+    uncached = _uncached_engine(cached)
+    results = {}
+    for name, (request, context) in template_contexts(size).items():
+        results[name] = {}
+        for label, use_cached_loader, keep_fragments in TEMPLATE_MODES:
+            engine = cached if use_cached_loader else uncached
+            timings = []
+            for run in range(warmup + iterations):
+                if not keep_fragments:
+                    _drop_fragments(request.user)
+                started = time.perf_counter()
+                engine.get_template(name).render(RequestContext(request, context))
+                if run >= warmup:
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[name][label] = {
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p90_ms': round(percentile(timings, 90), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+            }
+    return results
+
+
+CONNECTION_MODES = (
+    # label, CONN_MAX_AGE, CONN_HEALTH_CHECKS
+    ('connect per request', 0, False),
+    ('persistent', 600, False),
+    ('persistent + health checks', 600, True),
+)
+
+
+def run_connection_benchmarks(iterations=200, warmup=5, using=DEFAULT_DB_ALIAS):
+    """Time a one-query request cycle under each connection lifetime setting.
+
+    request_started and request_finished are sent around the query just like
+    the request handler does, so Django closes or keeps the connection exactly
+    as it would between real requests. When the database is configured with
+    native pooling (OPTIONS['pool']) that setup is timed as well.
+    """
+    conn = connections[using]
+    original = {key: conn.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    options = conn.settings_dict.setdefault('OPTIONS', {})
+    pool = options.pop('pool', None)
+    modes = [(label, max_age, checks, None) for label, max_age, checks in CONNECTION_MODES]
+    if pool:
+        modes.append(('native pool', 0, True, pool))
+
+    connects = []
+
+    def count_connect(sender, connection, **kwargs):
+        if connection.alias == using:
+            connects.append(connection)
+
+    connection_created.connect(count_connect)
+    results = {}
+    try:
+        for label, max_age, health_checks, mode_pool in modes:
+            conn.close()
+            conn.settings_dict.update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+            if mode_pool:
+                options['pool'] = mode_pool
+            timings = []
+            for run in range(warmup + iterations):
+                if run == warmup:
+                    connects.clear()
+                started = time.perf_counter()
+                request_started.send(sender=__name__)
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=__name__)
+                if run >= warmup:
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[label] = {
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p90_ms': round(percentile(timings, 90), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+                'connects': len(connects),
+            }
+            options.pop('pool', None)
+    finally:
+        connection_created.disconnect(count_connect)
+        conn.close()
+        conn.settings_dict.update(original)
+        if pool:
+            options['pool'] = pool
+    return results
@@ -0,0 +1,65 @@
+from django.conf import settings
+
+
+# Most queries a single request to each view may run, at any data size.
+# Logged-in requests include one query for the user. The session itself is
+# read from the cache with SESSION_ENGINE cached_db, and costs one more query
+# only when the cache misses; query_budget allows that query for the other
+# engines.
+# A "METHOD view" key overrides the plain view entry for that method.
+QUERY_BUDGETS = {
+    'food:main': 2,
+    'food:about_page': 2,
+    'food:contact': 2,
+    'food:login': 2,
+    # a successful login cycles the session and updates last_login
+    'POST food:login': 9,
+    'food:register': 2,
+    'food:order_success': 2,
+    'food:admin_dashboard': 12,
+    'food:add_food': 1,
+    'food:add_gallery': 1,
+    # counted until the streamed body is exhausted, the export's own query included
+    'food:export_data': 2,
+    'food:edit_food': 2,
+    # deleting bumps the catalog's CatalogVersion row as well
+    'food:delete_food': 7,
+    'food:delete_gallery': 5,
+    # completing adds the orders to the sales rollup: one locking read of the
+    # rollup rows, one bulk UPDATE and one bulk INSERT in a savepoint
+    'food:mark_done': 9,
+    'food:mark_order_completed': 9,
+    'food:mark_gallery_done': 9,
+    'food:complete_orders': 9,
+    'food:order_page': 3,
+    'food:gallery_order': 2,
+    'food:checkout': 3,
+    'food:payment': 3,
+    # settlement locks the cart, writes the payment and upserts the rollup
+    # set-wise, the same statements for any number of items
+    'POST food:payment': 12,
+    'food:feedback': 3,
+    'food:api_menu': 3,
+    'food:api_gallery': 3,
+    'food:api_search': 5,
+    'food:api_ratings': 3,
+    # the long-poll answer; an SSE stream is only counted up to its first byte
+    'food:order_feed': 3,
+    'food:sales_report': 3,
+}
+
+QUERY_BUDGET_DEFAULT = getattr(settings, 'QUERY_BUDGET_DEFAULT', 10)
+
+
+SESSION_ENGINES_WITHOUT_READS = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.signed_cookies',
+)
+
+
+def query_budget(view_name, method='GET'):
+    if view_name is None:
+        return QUERY_BUDGET_DEFAULT
+    budget = QUERY_BUDGETS.get(f"{method} {view_name}", QUERY_BUDGETS.get(view_name, QUERY_BUDGET_DEFAULT))
+    return budget if settings.SESSION_ENGINE in SESSION_ENGINES_WITHOUT_READS else budget + 1
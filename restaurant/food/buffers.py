@@ -0,0 +1,171 @@
+import atexit
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+
+from .models import ContactMessage, FeedBack
+from .ratings import record_ratings
+
+
+logger = logging.getLogger(__name__)
+
+BUFFER_MAX_SIZE = getattr(settings, 'WRITE_BUFFER_MAX_SIZE', 50)
+BUFFER_MAX_DELAY = getattr(settings, 'WRITE_BUFFER_MAX_DELAY', 2.0)
+BUFFER_MAX_PENDING = getattr(settings, 'WRITE_BUFFER_MAX_PENDING', 10000)
+BUFFER_MAX_RETRIES = getattr(settings, 'WRITE_BUFFER_MAX_RETRIES', 5)
+
+_buffers = []
+
+
+class WriteBuffer:
+    """In-process queue of unsaved rows written with one bulk_create.
+
+    A batch is flushed as soon as it holds ``max_size`` rows, or ``max_delay``
+    seconds after its first row was queued, whichever comes first. The buffer
+    is guarded by a thread lock rather than tied to an event loop, so it works
+    the same under ASGI and under WSGI workers that run async views through
+    async_to_sync.
+
+    ``on_flush`` is called with every written batch inside the same
+    transaction, so rows and whatever is derived from them land together.
+
+    A batch that violates a constraint is retried row by row and the rows
+    that still fail are dropped. Other failures keep the rows queued for at
+    most ``max_retries`` more flushes, and the queue never holds more than
+    ``max_pending`` rows; whatever is dropped is logged.
+    """
+
+    def __init__(self, model, max_size=BUFFER_MAX_SIZE, max_delay=BUFFER_MAX_DELAY, on_flush=None,
+                 max_pending=BUFFER_MAX_PENDING, max_retries=BUFFER_MAX_RETRIES):
+        self.model = model
+        self.on_flush = on_flush
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+        _buffers.append(self)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _start_timer(self):
+        # called with the lock held
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_delay, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _trim(self):
+        # called with the lock held, drops the oldest rows past max_pending
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            logger.error("%s write buffer is full, dropped the %d oldest rows.", self.model.__name__, overflow)
+
+    def _append(self, instance):
+        with self._lock:
+            self._pending.append(instance)
+            self._trim()
+            if len(self._pending) >= self.max_size:
+                return True
+            self._start_timer()
+            return False
+
+    def add(self, instance):
+        if self._append(instance):
+            self.flush()
+
+    async def aadd(self, instance):
+        # appending never touches the database, only a full batch leaves the loop
+        if self._append(instance):
+            await sync_to_async(self.flush)()
+
+    def _write(self, batch):
+        with transaction.atomic():
+            self.model.objects.bulk_create(batch)
+            if self.on_flush is not None:
+                self.on_flush(batch)
+
+    def _requeue(self, batch):
+        retry = []
+        for instance in batch:
+            # rolled back, so ids bulk_create may have assigned are not in the table
+            instance.pk = None
+            instance._buffer_attempts = getattr(instance, '_buffer_attempts', 0) + 1
+            if instance._buffer_attempts <= self.max_retries:
+                retry.append(instance)
+        if len(retry) < len(batch):
+            logger.error("Gave up on %d buffered %s rows after %d retries.",
+                         len(batch) - len(retry), self.model.__name__, self.max_retries)
+        with self._lock:
+            self._pending[:0] = retry
+            self._trim()
+
+    def _write_one_by_one(self, batch):
+        written, failed = 0, []
+        for instance in batch:
+            try:
+                self._write([instance])
+                written += 1
+            except IntegrityError:
+                # plain column values, __str__ may follow the very foreign key that broke
+                logger.exception("Dropping buffered %s row that cannot be written: %r", self.model.__name__, {
+                    field.attname: field.value_from_object(instance) for field in self.model._meta.concrete_fields
+                })
+            except Exception:
+                logger.exception("Could not write buffered %s row, keeping it queued.", self.model.__name__)
+                failed.append(instance)
+        self._requeue(failed)
+        return written
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+        try:
+            self._write(batch)
+            return len(batch)
+        except IntegrityError:
+            # one bad row (say feedback of a user deleted meanwhile) must not block the rest
+            logger.warning("Buffered %s batch of %d rows violates a constraint, writing it row by row.",
+                           self.model.__name__, len(batch))
+            for instance in batch:
+                instance.pk = None
+            return self._write_one_by_one(batch)
+        except Exception:
+            logger.exception("Could not write %d buffered %s rows, keeping them queued.",
+                             len(batch), self.model.__name__)
+            self._requeue(batch)
+            return 0
+        finally:
+            with self._lock:
+                if self._pending:
+                    self._start_timer()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # the timer thread opened its own connection, do not leak it
+            connections.close_all()
+
+
+def flush_all():
+    return sum(buffer.flush() for buffer in _buffers)
+
+
+contact_buffer = WriteBuffer(ContactMessage)
+feedback_buffer = WriteBuffer(FeedBack, on_flush=record_ratings)
+
+# WSGI servers have no shutdown hook, so also flush when the interpreter exits.
+atexit.register(flush_all)
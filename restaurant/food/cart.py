@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, Payments
+from .sales import record_sales
+
+
+class Cart:
+    """A user's pending order lines with their line totals, loaded in one query."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.total = sum((line.line_total for line in lines), Decimal('0'))
+
+    def __bool__(self):
+        return bool(self.lines)
+
+
+def pending_orders(user):
+    return Order.objects.filter(user=user, status='Pending').select_related('item', 'gallery_item').annotate(
+        line_total=Order.line_total_expression(),
+    ).order_by('id')
+
+
+def get_cart(user):
+    return Cart(list(pending_orders(user)))
+
+
+def settle_cart(user, **payment_fields):
+    """Pay for every pending order of ``user`` in one transaction.
+
+    The pending rows are locked first, so a second submit that races this one
+    waits and then finds nothing left to settle. Returns the Payments row, or
+    None when the cart was already empty.
+    """
+    with transaction.atomic():
+        cart = Cart(list(pending_orders(user).select_for_update(of=('self',))))
+        if not cart:
+            return None
+
+        payment = Payments.objects.create(user=user, amount=cart.total, **payment_fields)
+
+        settled = Order.objects.filter(id__in=[line.id for line in cart.lines])
+        record_sales(settled)
+        settled.update(status='Completed', updated_at=timezone.now())
+    return payment
@@ -0,0 +1,93 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogVersion, FoodItem, Gallery
+
+
+MENU_CACHE_KEY = 'food:catalog:menu'
+GALLERY_CACHE_KEY = 'food:catalog:gallery'
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def get_menu_items():
+    # Refilled from the primary, a lagging replica would put the rows from
+    # before an edit back for the whole timeout. Lists of plain model
+    # instances pickle fine for locmem and file based caches.
+    return cache.get_or_set(
+        MENU_CACHE_KEY, lambda: list(FoodItem.objects.using(DEFAULT_DB_ALIAS)), CATALOG_CACHE_TIMEOUT,
+    )
+
+
+def get_gallery_images():
+    return cache.get_or_set(
+        GALLERY_CACHE_KEY, lambda: list(Gallery.objects.using(DEFAULT_DB_ALIAS)), CATALOG_CACHE_TIMEOUT,
+    )
+
+
+def _catalog_version(kind, request=None):
+    """(version, updated_at) of one catalog, read once per request from the primary.
+
+    A replica lagging behind an edit would hand out the old validators.
+    """
+    versions = getattr(request, '_catalog_versions', {})
+    if kind not in versions:
+        versions[kind] = CatalogVersion.objects.using(DEFAULT_DB_ALIAS).filter(
+            kind=kind,
+        ).values_list('version', 'updated_at').first() or (0, None)
+        if request is not None:
+            request._catalog_versions = versions
+    return versions[kind]
+
+
+def bump_catalog_version(kind):
+    updated = CatalogVersion.objects.filter(kind=kind).update(version=F('version') + 1, updated_at=timezone.now())
+    if not updated:
+        CatalogVersion.objects.get_or_create(kind=kind, defaults={'version': 1})
+
+
+def catalog_last_modified(kind, request=None):
+    return _catalog_version(kind, request)[1]
+
+
+def catalog_etag(kind, request):
+    version, _ = _catalog_version(kind, request)
+    # the query string is part of the representation (category, cursor, limit)
+    raw = f"{kind}:{version}:{request.GET.urlencode()}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def invalidate_menu():
+    cache.delete(MENU_CACHE_KEY)
+    bump_catalog_version('menu')
+
+
+def invalidate_gallery():
+    cache.delete(GALLERY_CACHE_KEY)
+    bump_catalog_version('gallery')
+
+
+def serialize_food_item(item, request):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'category': item.category,
+        'price': str(item.price),
+        'description': item.description,
+        'image': request.build_absolute_uri(item.image.url) if item.image else None,
+        'created_at': item.created_at.isoformat(),
+    }
+
+
+def serialize_gallery_image(image, request):
+    return {
+        'id': image.id,
+        'caption': image.caption,
+        'price': str(image.price),
+        'image': request.build_absolute_uri(image.image.url) if image.image else None,
+        'created_at': image.created_at.isoformat(),
+    }
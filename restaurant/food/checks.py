@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+CACHE_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+PER_PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    """A cache backed session engine needs a cache every worker shares."""
+    if settings.SESSION_ENGINE not in CACHE_SESSION_ENGINES:
+        return []
+    backend = settings.CACHES.get(settings.SESSION_CACHE_ALIAS, {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        f"SESSION_ENGINE {settings.SESSION_ENGINE} keeps sessions in the per process "
+        f"{backend.rsplit('.', 1)[-1]} cache '{settings.SESSION_CACHE_ALIAS}'.",
+        hint="With more than one worker a logout or session change is not seen by the others. "
+             "Point SESSION_CACHE_BACKEND at a shared cache or use the db session engine.",
+        id='food.W001',
+    )]
@@ -0,0 +1,109 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Order, Payments
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (model, row filter, timestamp field used by the date range, [(column, lookup), ...])
+# Payments deliberately leaves out bank_on_card, card_number, expiration_date and cvv.
+EXPORTS = {
+    'orders': (Order, {'item__isnull': False}, 'ordered_at', [
+        ('id', 'id'),
+        ('username', 'user__username'),
+        ('item', 'item__name'),
+        ('category', 'item__category'),
+        ('quantity', 'quantity'),
+        ('unit_price', 'item__price'),
+        ('status', 'status'),
+        ('ordered_at', 'ordered_at'),
+    ]),
+    'gallery_orders': (Order, {'gallery_item__isnull': False}, 'ordered_at', [
+        ('id', 'id'),
+        ('username', 'user__username'),
+        ('item', 'gallery_item__caption'),
+        ('quantity', 'quantity'),
+        ('unit_price', 'gallery_item__price'),
+        ('status', 'status'),
+        ('ordered_at', 'ordered_at'),
+    ]),
+    'payments': (Payments, {}, 'created_at', [
+        ('id', 'id'),
+        ('username', 'user__username'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('address', 'address'),
+        ('country', 'country'),
+        ('state', 'state'),
+        ('pin_code', 'pin_code'),
+        ('payment_method', 'payment_method'),
+        ('amount', 'amount'),
+        ('created_at', 'created_at'),
+    ]),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """csv.writer target that hands each formatted line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def parse_export_date(value):
+    """Optional YYYY-MM-DD query parameter; ValueError when it is present but invalid."""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    return parsed
+
+
+def export_rows(kind, start=None, end=None):
+    """values_list tuples for one export, oldest first, read in chunks.
+
+    ``start`` and ``end`` are inclusive dates turned into timestamp bounds,
+    so the range can use the timestamp index.
+    """
+    model, filters, timestamp, columns = EXPORTS[kind]
+    queryset = model.objects.filter(**filters).order_by('id')
+    if start:
+        queryset = queryset.filter(**{f"{timestamp}__gte": timezone.make_aware(datetime.combine(start, time.min))})
+    if end:
+        next_day = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        queryset = queryset.filter(**{f"{timestamp}__lt": next_day})
+    return queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def export_headers(kind):
+    return [column for column, _ in EXPORTS[kind][3]]
+
+
+def stream_csv(kind, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(export_headers(kind))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(kind, rows):
+    headers = export_headers(kind)
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=str) + "\n"
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Order
+
+
+# seconds between checks for new changes, shared by every open feed of the process
+ORDER_FEED_INTERVAL = getattr(settings, 'ORDER_FEED_INTERVAL', 1.0)
+# longest a long-poll request waits before answering with nothing
+ORDER_FEED_TIMEOUT = getattr(settings, 'ORDER_FEED_TIMEOUT', 25.0)
+# under WSGI a waiting request holds a whole worker, so it answers right away
+# and the page asks again after ORDER_FEED_POLL_DELAY seconds
+ORDER_FEED_WSGI_TIMEOUT = getattr(settings, 'ORDER_FEED_WSGI_TIMEOUT', 0)
+ORDER_FEED_POLL_DELAY = getattr(settings, 'ORDER_FEED_POLL_DELAY', 5)
+# an event stream ends after this long and the browser reconnects from its last cursor
+ORDER_FEED_STREAM_SECONDS = getattr(settings, 'ORDER_FEED_STREAM_SECONDS', 300)
+ORDER_FEED_KEEPALIVE = getattr(settings, 'ORDER_FEED_KEEPALIVE', 15)
+# updated_at is taken before commit; rows this young may still have slower
+# transactions committing behind them, so they are left for the next check
+ORDER_FEED_SETTLE = getattr(settings, 'ORDER_FEED_SETTLE', 1.0)
+ORDER_FEED_LIMIT = 100
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+def encode_cursor(cursor):
+    updated_at, order_id = cursor
+    return f"{(updated_at - EPOCH) // MICROSECOND}.{order_id}"
+
+
+def decode_cursor(value):
+    """Parse a cursor from the query string or Last-Event-ID, raising ValueError."""
+    micros, _, order_id = value.partition('.')
+    return EPOCH + int(micros) * MICROSECOND, int(order_id or 0)
+
+
+def settled_before():
+    return timezone.now() - timedelta(seconds=ORDER_FEED_SETTLE)
+
+
+def current_cursor():
+    """Cursor for "everything from now on"; costs no query.
+
+    Rows changed within the settle window are sent again, which the kitchen
+    screen handles like any other update to a row it already shows.
+    """
+    return settled_before(), 0
+
+
+def fetch_changes(cursor, limit=ORDER_FEED_LIMIT):
+    """Orders created or changed after ``cursor`` in (updated_at, id) order, and the new cursor.
+
+    One range scan over order_updated_at_idx.
+    """
+    updated_at, order_id = cursor
+    rows = list(
+        Order.objects.select_related('user', 'item', 'gallery_item')
+        .filter(updated_at__gte=updated_at, updated_at__lte=settled_before())
+        .exclude(updated_at=updated_at, id__lte=order_id)
+        .order_by('updated_at', 'id')[:limit]
+    )
+    if rows:
+        cursor = rows[-1].updated_at, rows[-1].id
+    return rows, cursor
+
+
+class ChangeNotifier:
+    """Latest Order.updated_at, read at most once per interval for the whole process.
+
+    Open feeds only run fetch_changes once this moves past their cursor, so
+    an idle kitchen screen costs one index lookup per interval however many
+    of them are open.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = None
+        self._checked = None
+
+    def latest(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is None or now - self._checked >= ORDER_FEED_INTERVAL:
+                self._latest = Order.objects.aggregate(latest=Max('updated_at'))['latest']
+                self._checked = now
+            return self._latest
+
+
+notifier = ChangeNotifier()
+
+
+async def _next_changes(cursor, page_full):
+    # a full page may have left rows behind at the cursor's own timestamp
+    if not page_full:
+        latest = await sync_to_async(notifier.latest)()
+        if latest is None or latest <= cursor[0]:
+            return [], cursor
+    return await sync_to_async(fetch_changes)(cursor)
+
+
+def serialize_order(order):
+    is_food = order.item_id is not None
+    return {
+        'id': order.id,
+        'kind': 'food' if is_food else 'gallery',
+        'user': order.user.username,
+        'item': order.product_name,
+        'quantity': order.quantity,
+        'total': str(order.total_price),
+        'status': order.status,
+        'ordered_at': order.ordered_at.isoformat(),
+        'updated_at': order.updated_at.isoformat(),
+        'done_url': reverse('food:mark_done' if is_food else 'food:mark_gallery_done', args=[order.id]),
+    }
+
+
+async def wait_for_changes(cursor, timeout):
+    """Long-poll: return as soon as something changed, or empty-handed after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    rows, cursor = await sync_to_async(fetch_changes)(cursor)
+    while not rows and time.monotonic() < deadline:
+        await asyncio.sleep(min(ORDER_FEED_INTERVAL, max(deadline - time.monotonic(), 0)))
+        rows, cursor = await _next_changes(cursor, page_full=False)
+    return rows, cursor
+
+
+async def order_events(cursor):
+    """Server-Sent Events for the kitchen screen.
+
+    Every message carries the cursor as its id, keep-alives included, so the
+    browser's automatic reconnect resumes exactly where it stopped via
+    Last-Event-ID. Only served under ASGI, where a disconnecting client
+    cancels the generator.
+    """
+    yield f"retry: 3000\nid: {encode_cursor(cursor)}\n\n"
+    started = last_sent = time.monotonic()
+    rows, cursor = await sync_to_async(fetch_changes)(cursor)
+    while time.monotonic() - started < ORDER_FEED_STREAM_SECONDS:
+        if rows:
+            data = json.dumps([serialize_order(order) for order in rows])
+            yield f"id: {encode_cursor(cursor)}\nevent: orders\ndata: {data}\n\n"
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= ORDER_FEED_KEEPALIVE:
+            # also stops proxies from closing an idle connection
+            yield f"id: {encode_cursor(cursor)}\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(ORDER_FEED_INTERVAL)
+        rows, cursor = await _next_changes(cursor, page_full=len(rows) == ORDER_FEED_LIMIT)
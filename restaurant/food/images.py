@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+
+# widths in px of the resized copies kept next to every upload
+DERIVATIVE_WIDTHS = (120, 320, 640)
+DERIVATIVE_FORMATS = (
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+)
+DERIVATIVE_DIR = 'derivatives'
+# how long a worker trusts that an upload's derivatives exist before asking storage again
+DERIVATIVE_CHECK_TIMEOUT = 60 * 60 * 24
+
+# one thread per process builds the derivatives of new uploads, after the
+# saving request has committed and answered
+_builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+
+
+def derivative_name(name, width, ext):
+    """food_images/dish.jpeg -> food_images/derivatives/dish.jpeg_320.webp
+
+    The source extension stays in the name, so dish.png and dish.jpg never
+    share derivatives.
+    """
+    folder, filename = posixpath.split(name)
+    return posixpath.join(folder, DERIVATIVE_DIR, f"{filename}_{width}.{ext}")
+
+
+def derivative_names(name):
+    return [
+        derivative_name(name, width, ext)
+        for width in DERIVATIVE_WIDTHS
+        for ext, _, _ in DERIVATIVE_FORMATS
+    ]
+
+
+def build_derivatives(media_root, name, overwrite=False):
+    """Write every width/format variant of ``name`` and return how many were written.
+
+    Works on plain paths and needs no Django setup, so it can run inside the
+    worker processes of the backfill command.
+    """
+    targets = [
+        (width, ext, fmt, options, os.path.join(media_root, derivative_name(name, width, ext)))
+        for width in DERIVATIVE_WIDTHS
+        for ext, fmt, options in DERIVATIVE_FORMATS
+    ]
+    if not overwrite:
+        targets = [target for target in targets if not os.path.exists(target[-1])]
+    if not targets:
+        return 0
+
+    with Image.open(os.path.join(media_root, name)) as source:
+        source = ImageOps.exif_transpose(source)
+        has_alpha = source.mode in ('RGBA', 'LA') or 'transparency' in source.info
+        for width, ext, fmt, options, path in targets:
+            # never upscale, a small original just gets re-encoded
+            height = round(source.height * min(width, source.width) / source.width)
+            resized = source.resize((min(width, source.width), height), Image.LANCZOS)
+            if fmt == 'WEBP' and has_alpha:
+                resized = resized.convert('RGBA')
+            else:
+                resized = resized.convert('RGB')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            resized.save(path, fmt, **options)
+    return len(targets)
+
+
+def build_field_derivatives(storage, name):
+    if not name or not storage.exists(name):
+        return 0
+    return build_derivatives(storage.location, name)
+
+
+def _build_logged(storage, name):
+    try:
+        return build_field_derivatives(storage, name)
+    except Exception:
+        # the page falls back to the original upload, a bad file only costs the resized copies
+        logger.exception("Could not build derivatives of %s", name)
+        return 0
+
+
+def build_in_background(storage, name):
+    """Queue the derivatives of ``name`` on the builder thread and return its Future."""
+    return _builder.submit(_build_logged, storage, name)
+
+
+def wait_for_builds():
+    """Block until every build queued so far has finished."""
+    _builder.submit(lambda: None).result()
+
+
+def _built_key(name):
+    return f"food:derivatives:{hashlib.sha1(name.encode()).hexdigest()}"
+
+
+def derivatives_built(storage, name):
+    """Whether ``name`` has its derivatives, asking storage at most once per DERIVATIVE_CHECK_TIMEOUT.
+
+    Only a yes is remembered, so an upload whose build is still queued
+    switches to its derivatives as soon as they are written.
+    """
+    key = _built_key(name)
+    if cache.get(key):
+        return True
+    if not storage.exists(derivative_name(name, DERIVATIVE_WIDTHS[0], 'jpg')):
+        return False
+    cache.set(key, True, DERIVATIVE_CHECK_TIMEOUT)
+    return True
+
+
+def delete_field_derivatives(storage, name):
+    """Remove the derivatives of an upload that was replaced or deleted."""
+    cache.delete(_built_key(name))
+    for derivative in derivative_names(name):
+        storage.delete(derivative)
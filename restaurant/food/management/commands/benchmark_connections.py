@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from food.benchmark import run_connection_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Compare per-request connection overhead with and without persistent connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.stderr.write("In-memory SQLite never closes its connection, every mode will look the same.")
+
+        results = run_connection_benchmarks(options['iterations'], options['warmup'], options['database'])
+
+        header = f"{'mode':<30}{'p50 ms':>10}{'p90 ms':>10}{'mean ms':>10}{'connects':>10}"
+        self.stdout.write(f"{connection.vendor} database '{options['database']}', {options['iterations']} requests")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, row in results.items():
+            self.stdout.write(
+                f"{label:<30}{row['p50_ms']:>10.3f}{row['p90_ms']:>10.3f}{row['mean_ms']:>10.3f}{row['connects']:>10}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'database': connection.vendor, 'iterations': options['iterations'], 'modes': results},
+                          fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
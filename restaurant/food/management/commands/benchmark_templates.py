@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from food.benchmark import TEMPLATE_MODES, run_template_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Time rendering main.html and admin_dashboard.html with large contexts, with and without template caching."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--size', type=int, default=200, help="Rows in every list of the context.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        results = run_template_benchmarks(options['iterations'], options['warmup'], options['size'])
+
+        header = f"{'template':<28}{'mode':<28}{'p50 ms':>10}{'p90 ms':>10}{'mean ms':>10}{'speedup':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, modes in results.items():
+            baseline = modes[TEMPLATE_MODES[0][0]]['mean_ms']
+            for label, row in modes.items():
+                self.stdout.write(
+                    f"{name:<28}{label:<28}{row['p50_ms']:>10.2f}{row['p90_ms']:>10.2f}"
+                    f"{row['mean_ms']:>10.2f}{baseline / row['mean_ms']:>8.2f}x"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'size': options['size'], 'iterations': options['iterations'], 'templates': results},
+                          fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
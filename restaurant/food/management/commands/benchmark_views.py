@@ -0,0 +1,54 @@
+import json
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from food.benchmark import ROUTES, missing_routes, run_benchmarks
+from food.models import CustomUser, FeedBack, FoodItem, Gallery, Order, Payments
+
+
+class Command(BaseCommand):
+    help = "Time every food route through the test client and report latency percentiles and query counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', dest='routes', help="Only benchmark this route name (repeatable).")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        missing = missing_routes()
+        if missing:
+            raise CommandError(f"No benchmark spec for: {', '.join(missing)}. Add them to food.benchmark.ROUTES.")
+        unknown = set(options['routes'] or []) - ROUTES.keys()
+        if unknown:
+            raise CommandError(f"Unknown route: {', '.join(sorted(unknown))}")
+
+        results = run_benchmarks(options['iterations'], options['warmup'], options['routes'])
+
+        header = f"{'route':<22}{'method':<7}{'status':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'queries':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, row in results.items():
+            queries = str(row['queries_max']) if row['queries_min'] == row['queries_max'] \
+                else f"{row['queries_min']}-{row['queries_max']}"
+            self.stdout.write(
+                f"{name:<22}{row['method']:<7}{row['status']:>7}"
+                f"{row['p50_ms']:>10.2f}{row['p90_ms']:>10.2f}{row['p99_ms']:>10.2f}{queries:>10}"
+            )
+
+        if options['output']:
+            report = {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'rows': {
+                    model.__name__: model.objects.count()
+                    for model in (CustomUser, FoodItem, Gallery, Order, Payments, FeedBack)
+                },
+                'views': results,
+            }
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,55 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from food.images import DERIVATIVE_DIR, build_derivatives
+
+
+IMAGE_DIRS = ('food_images', 'gallery')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+class Command(BaseCommand):
+    help = "Build resized JPEG/WebP derivatives for existing food and gallery images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
+        parser.add_argument('--overwrite', action='store_true', help="Rebuild derivatives that already exist.")
+
+    def find_images(self, media_root):
+        for folder in IMAGE_DIRS:
+            path = os.path.join(media_root, folder)
+            if not os.path.isdir(path):
+                continue
+            for filename in sorted(os.listdir(path)):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield f"{folder}/{filename}"
+
+    def handle(self, *args, **options):
+        media_root = str(settings.MEDIA_ROOT)
+        names = list(self.find_images(media_root))
+        started = time.perf_counter()
+        written = failed = 0
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(build_derivatives, media_root, name, options['overwrite']): name
+                for name in names
+            }
+            for future in as_completed(futures):
+                try:
+                    written += future.result()
+                except Exception as exc:
+                    # a corrupt or oversized upload (UnidentifiedImageError,
+                    # DecompressionBombError, ...) only skips that one file
+                    failed += 1
+                    self.stderr.write(f"Skipped {futures[future]}: {exc}")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(names)} images into {DERIVATIVE_DIR}/ "
+            f"({written} files written, {failed} failed) in {elapsed:.1f}s."
+        ))
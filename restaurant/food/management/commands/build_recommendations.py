@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from food.recommendations import (
+    RECOMMENDATION_BASKET_WINDOW, RECOMMENDATION_MIN_SUPPORT, RECOMMENDATION_TOP_K, build_recommendations,
+)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the \"frequently ordered together\" table from order history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=RECOMMENDATION_TOP_K,
+                            help="Neighbours kept per item.")
+        parser.add_argument('--window', type=int, default=RECOMMENDATION_BASKET_WINDOW,
+                            help="Seconds between a user's orders that still count as one basket.")
+        parser.add_argument('--min-support', type=int, default=RECOMMENDATION_MIN_SUPPORT,
+                            help="Baskets a pair must share before it is recommended.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = build_recommendations(
+            top_k=options['top_k'], window=options['window'], min_support=options['min_support'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} recommendations in {elapsed:.1f}s."))
@@ -0,0 +1,37 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from food.userimport import IMPORT_FORMATS, import_users, read_records
+
+
+class Command(BaseCommand):
+    help = "Import users from a CSV or JSON lines file, hashing passwords across worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with a header row, or JSON lines, with username, email, "
+                                         "password and optional user_type.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of hashing processes.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.stdout.write(f"Importing users from {options['path']}:")
+        try:
+            counts = import_users(
+                read_records(options['path'], options['format']),
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                stdout=self.stdout,
+                stderr=self.stderr,
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['imported']} users in {elapsed:.1f}s "
+            f"({counts['imported'] / elapsed:.0f} users/s), skipped {counts['conflicts']} conflicts "
+            f"and {counts['invalid']} invalid rows."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from food.sales import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySales rollup from completed order history."
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_sales()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily sales rollup with {count} rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from food.ratings import rebuild_rating_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the global and per-user feedback rating counters from the feedback table."
+
+    def handle(self, *args, **options):
+        count = rebuild_rating_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating counters with {count} rows."))
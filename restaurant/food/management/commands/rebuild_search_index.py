@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from food.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the menu search inverted index from every FoodItem."
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} menu search terms."))
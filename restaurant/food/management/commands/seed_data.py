@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food.catalog import invalidate_gallery, invalidate_menu
+from food.ratings import rebuild_rating_counters
+from food.recommendations import build_recommendations
+from food.sales import rebuild_daily_sales
+from food.search import rebuild_search_index
+from food.seeding import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = "Insert synthetic users, menu items, orders, payments and feedback with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--food-items', type=int, default=50)
+        parser.add_argument('--gallery', type=int, default=20)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--gallery-orders', type=int, default=300)
+        parser.add_argument('--payments', type=int, default=300)
+        parser.add_argument('--feedback', type=int, default=200)
+        parser.add_argument('--days', type=int, default=30, help="Spread timestamps over this many past days.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for reproducible data.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.stdout.write("Seeding:")
+        with transaction.atomic():
+            seed(
+                users=options['users'],
+                food_items=options['food_items'],
+                gallery=options['gallery'],
+                orders=options['orders'],
+                gallery_orders=options['gallery_orders'],
+                payments=options['payments'],
+                feedback=options['feedback'],
+                days=options['days'],
+                batch_size=options['batch_size'],
+                random_seed=options['seed'],
+                stdout=self.stdout,
+            )
+            # bulk_create skips the signals that normally keep these up to date
+            rebuild_search_index()
+            rebuild_daily_sales()
+            rebuild_rating_counters()
+            build_recommendations()
+        invalidate_menu()
+        invalidate_gallery()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {elapsed:.1f}s. Seeded users log in with password '{SEED_PASSWORD}'."
+        ))
@@ -0,0 +1,147 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+
+# only uploads (and their derivatives) are public, never anything else under MEDIA_ROOT
+MEDIA_SERVE_DIRS = ('food_images', 'gallery')
+MEDIA_CACHE_MAX_AGE = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 60 * 60 * 24 * 365)
+MEDIA_SENDFILE = getattr(settings, 'MEDIA_SENDFILE', '')
+MEDIA_SENDFILE_PREFIX = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Read-only view of the next ``length`` bytes of an open file.
+
+    It keeps ``fileno()``, so a WSGI server's file_wrapper (gunicorn) still
+    sendfile()s the range from the current offset and stops after
+    Content-Length bytes, while other servers read it in blocks.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+@lru_cache(maxsize=getattr(settings, 'MEDIA_ETAG_CACHE_SIZE', 4096))
+def _content_hash(path, mtime_ns, size):
+    # keyed on mtime and size, so a replaced file is hashed again
+    digest = hashlib.sha1()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_etag(path, stat):
+    return quote_etag(_content_hash(path, stat.st_mtime_ns, stat.st_size))
+
+
+def parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, None to serve the
+    whole file, or False when the range cannot be satisfied."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # malformed or multipart ranges, answering 200 with everything is allowed
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # "bytes=-500" is the last 500 bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _resolve(path):
+    path = posixpath.normpath(path)
+    if path.split('/', 1)[0] not in MEDIA_SERVE_DIRS:
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return path, full_path
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an upload with long caching, a content-hash ETag and byte ranges.
+
+    With MEDIA_SENDFILE set to ``x-accel-redirect`` (nginx) or ``x-sendfile``
+    (Apache, lighttpd) only the headers are built here and the front server
+    sends the bytes, ranges included.
+    """
+    path, full_path = _resolve(path)
+    stat = os.stat(full_path)
+    etag = content_etag(full_path, stat)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': f"public, max-age={MEDIA_CACHE_MAX_AGE}",
+        'Accept-Ranges': 'bytes',
+    }
+
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers=headers)
+
+    if MEDIA_SENDFILE:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if MEDIA_SENDFILE == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = MEDIA_SENDFILE_PREFIX + quote(path)
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+
+    byte_range = None
+    if 'Range' in request.headers and request.headers.get('If-Range', etag) == etag:
+        byte_range = parse_range(request.headers['Range'], stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f"bytes */{stat.st_size}"
+        return response
+
+    handle = open(full_path, 'rb')
+    if byte_range is None:
+        return FileResponse(handle, content_type=content_type, headers=headers)
+
+    start, end = byte_range
+    handle.seek(start)
+    response = FileResponse(RangeFile(handle, end - start + 1), status=206,
+                            content_type=content_type, headers=headers)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+    return response
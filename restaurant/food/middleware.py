@@ -0,0 +1,141 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .budgets import query_budget
+from .routers import PIN_COOKIE, READ_YOUR_WRITES_WINDOW, begin_request, end_request
+
+
+logger = logging.getLogger('food.queries')
+
+
+class QueryCounter:
+    """connection.execute_wrapper hook adding up the queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class QueryBudgetMiddleware:
+    """Count the SQL run by each request and log the ones over their budget in food.budgets.
+
+    Works in both sync and async chains, so it never forces the async views
+    behind it onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _counting(counter):
+        stack = ExitStack()
+        # replica reads count against the budget too
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        return stack
+
+    def _check(self, request, counter):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = query_budget(view_name, request.method)
+        if counter.count > budget:
+            logger.warning(
+                "%s %s (%s) ran %d queries in %.1f ms, budget is %d",
+                request.method, request.path, view_name, counter.count, counter.duration * 1000, budget,
+            )
+
+    def _counted_stream(self, request, content, counter):
+        # consumed by the server on one thread once the middleware has returned
+        try:
+            with self._counting(counter):
+                yield from content
+        finally:
+            self._check(request, counter)
+
+    def _report(self, request, response, counter):
+        if response.streaming and not response.is_async:
+            # exports run their queries while the body is iterated, so keep
+            # counting until it is exhausted and check the budget then
+            response.streaming_content = self._counted_stream(request, response.streaming_content, counter)
+            return response
+        # async streams (the kitchen feed's SSE) are open ended and only
+        # counted up to the response
+        self._check(request, counter)
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"'
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        counter = QueryCounter()
+        with self._counting(counter):
+            response = self.get_response(request)
+        return self._report(request, response, counter)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        with self._counting(counter):
+            response = await self.get_response(request)
+        return self._report(request, response, counter)
+
+
+class ReplicaPinningMiddleware:
+    """Keep a client's reads on the primary for a short while after it wrote.
+
+    Any write made while serving the request (the session save included)
+    sets a cookie that lasts READ_YOUR_WRITES_WINDOW seconds, long enough for
+    the replicas to catch up. food.routers reads it back on the next request.
+    The routing state lives in a context variable, so async requests work
+    the same way.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _pin(state, response):
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=READ_YOUR_WRITES_WINDOW, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = begin_request(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self._pin(state, response)
+
+    async def __acall__(self, request):
+        state, token = begin_request(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self._pin(state, response)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('item_type', models.CharField(choices=[('food', 'Food'), ('gallery', 'Gallery')], max_length=10)),
+                ('item_id', models.PositiveBigIntegerField()),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'item_type', 'item_id'), name='unique_daily_sales_item')],
+            },
+        ),
+    ]
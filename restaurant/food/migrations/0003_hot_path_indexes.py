@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0002_dailysales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['-sent_at'], name='contact_sent_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['user', '-created_at'], name='feedback_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryorder',
+            index=models.Index(fields=['user', 'status'], name='galleryorder_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryorder',
+            index=models.Index(fields=['-ordered_at'], name='galleryorder_ordered_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-ordered_at'], name='order_ordered_at_idx'),
+        ),
+    ]
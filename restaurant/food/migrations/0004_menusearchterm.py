@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('category', models.CharField(max_length=100)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='food.fooditem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'category', 'food_item', 'weight'], name='menu_search_covering_idx')],
+                'constraints': [models.UniqueConstraint(fields=('term', 'food_item'), name='unique_menu_search_term')],
+            },
+        ),
+    ]
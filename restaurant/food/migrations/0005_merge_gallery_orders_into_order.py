@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_gallery_orders(apps, schema_editor):
+    # one INSERT ... SELECT keeps ordered_at, which bulk_create would overwrite
+    Order = apps.get_model('food', 'Order')
+    GalleryOrder = apps.get_model('food', 'GalleryOrder')
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f"INSERT INTO {quote(Order._meta.db_table)} (user_id, gallery_item_id, quantity, ordered_at, status) "
+        f"SELECT user_id, gallery_item_id, quantity, ordered_at, status "
+        f"FROM {quote(GalleryOrder._meta.db_table)} ORDER BY id"
+    )
+
+
+def split_gallery_orders(apps, schema_editor):
+    Order = apps.get_model('food', 'Order')
+    GalleryOrder = apps.get_model('food', 'GalleryOrder')
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f"INSERT INTO {quote(GalleryOrder._meta.db_table)} (user_id, gallery_item_id, quantity, ordered_at, status) "
+        f"SELECT user_id, gallery_item_id, quantity, ordered_at, status "
+        f"FROM {quote(Order._meta.db_table)} WHERE gallery_item_id IS NOT NULL ORDER BY id"
+    )
+    Order.objects.filter(gallery_item__isnull=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0004_menusearchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='gallery_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='food.gallery'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='food.fooditem'),
+        ),
+        migrations.RunPython(copy_gallery_orders, split_gallery_orders),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('gallery_item__isnull', True), ('item__isnull', False)), models.Q(('gallery_item__isnull', False), ('item__isnull', True)), _connector='OR'), name='order_food_xor_gallery_item'),
+        ),
+        migrations.DeleteModel(
+            name='GalleryOrder',
+        ),
+    ]
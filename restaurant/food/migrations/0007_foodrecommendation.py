@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0006_ratingcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('together', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='food.fooditem')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='food.fooditem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('item', 'rank'), name='unique_food_recommendation_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def start_from_ordered_at(apps, schema_editor):
+    # existing rows last changed no later than now, ordered_at is the best guess
+    Order = apps.get_model('food', 'Order')
+    Order.objects.update(updated_at=models.F('ordered_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0007_foodrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(start_from_ordered_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at', 'id'], name='order_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0008_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(fields=['created_at'], name='payments_created_at_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.db.models import ExpressionWrapper, F
+from django.db.models.functions import Coalesce, Lower
 
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICE = (
@@ -13,6 +15,12 @@ class CustomUser(AbstractUser):
     password = models.CharField(max_length=128)
     user_type = models.CharField(max_length=10, choices=USER_TYPE_CHOICE, default='user')
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # case-insensitive email lookups (import_users) compare LOWER(email)
+            models.Index(Lower('email'), name='customuser_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -36,22 +44,58 @@ class FoodItem(models.Model):
 
 
 class Order(models.Model):
+    """One line of a cart: a quantity of either a FoodItem or a Gallery entry."""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    item = models.ForeignKey(FoodItem, on_delete=models.CASCADE)
+    item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, null=True, blank=True)
+    gallery_item = models.ForeignKey('Gallery', on_delete=models.CASCADE, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
     ordered_at = models.DateTimeField(auto_now_add=True)
+    # bumped on every change, bulk .update() calls included, for the kitchen feed
+    updated_at = models.DateTimeField(auto_now=True)
     STATUS_CHOICES = (
         ('Pending', 'Pending'),
         ('Completed', 'Completed'),
     )
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
 
+    @property
+    def product(self):
+        return self.item if self.item_id else self.gallery_item
+
+    @property
+    def product_name(self):
+        return self.item.name if self.item_id else self.gallery_item.caption
+
     @property
     def total_price(self):
-        return self.quantity * self.item.price
+        return self.quantity * self.product.price
+
+    @staticmethod
+    def line_total_expression():
+        """quantity * unit price as SQL, for annotate() and aggregate()."""
+        return ExpressionWrapper(
+            F('quantity') * Coalesce('item__price', 'gallery_item__price'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(item__isnull=False, gallery_item__isnull=True)
+                    | models.Q(item__isnull=True, gallery_item__isnull=False)
+                ),
+                name='order_food_xor_gallery_item',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+            models.Index(fields=['-ordered_at'], name='order_ordered_at_idx'),
+            models.Index(fields=['updated_at', 'id'], name='order_updated_at_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.item.name} x {self.quantity}"
+        return f"{self.user.username} - {self.product_name} x {self.quantity}"
 
 
 
@@ -62,6 +106,11 @@ class ContactMessage(models.Model):
     message = models.TextField()
     sent_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-sent_at'], name='contact_sent_at_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.subject}"
 
@@ -76,28 +125,6 @@ class Gallery(models.Model):
         return f"{self.caption} (Gallery Image {self.id})"
 
 
-class GalleryOrder(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    gallery_item = models.ForeignKey('Gallery', on_delete=models.CASCADE)
-    quantity = models.PositiveIntegerField(default=1)
-    ordered_at = models.DateTimeField(auto_now_add=True)
-    
-    STATUS_CHOICES = (
-        ('Pending', 'Pending'),
-        ('Completed', 'Completed'),
-    )
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
-
-    @property
-    def total_price(self):
-        return self.quantity * self.gallery_item.price
-
-    def __str__(self):
-        return f"{self.user.username} - {self.gallery_item.caption} x {self.quantity}"
-
-
-
-
 class Payments(models.Model):
     PAY_METHOD_CHOICES = [
         ('credit', 'Credit Card'),
@@ -119,6 +146,12 @@ class Payments(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # date range of the payments export
+            models.Index(fields=['created_at'], name='payments_created_at_idx'),
+        ]
+
     def __str__(self):
         return f"Order by {self.first_name} {self.last_name} - {self.created_at.strftime('%Y-%m-%d')}"
     
@@ -128,5 +161,122 @@ class FeedBack(models.Model):
     rating = models.IntegerField(choices=[(1, '⭐'), (2, '⭐⭐'), (3, '⭐⭐⭐'), (4, '⭐⭐⭐⭐'), (5, '⭐⭐⭐⭐⭐')])
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='feedback_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f" Feedback From  {self.user.username} on {self.rating}⭐"
+
+class RatingCounter(models.Model):
+    """Running feedback rating totals for everyone or for a single user.
+
+    Kept up to date with F() increments whenever feedback is written, so the
+    average and histogram never need a scan of FeedBack.
+    """
+    SCOPE_CHOICES = (
+        ('global', 'Everyone'),
+        ('user', 'User'),
+        ('item', 'Item'),
+    )
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # the user or item id, 0 for the global row
+    object_id = models.PositiveBigIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'object_id'], name='unique_rating_counter_scope'),
+        ]
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 2) if self.count else None
+
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f"rating_{rating}") for rating in range(1, 6)}
+
+    def __str__(self):
+        return f"{self.scope} #{self.object_id}: {self.count} ratings, avg {self.average}"
+
+
+class CatalogVersion(models.Model):
+    """Change counter of one public catalog, bumped by the save and delete signals.
+
+    Kept in the database rather than the cache so every worker builds the
+    same ETag and Last-Modified for the catalog API.
+    """
+    kind = models.CharField(max_length=20, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} v{self.version}"
+
+
+class DailySales(models.Model):
+    ITEM_TYPE_CHOICES = (
+        ('food', 'Food'),
+        ('gallery', 'Gallery'),
+    )
+    day = models.DateField()
+    item_type = models.CharField(max_length=10, choices=ITEM_TYPE_CHOICES)
+    item_id = models.PositiveBigIntegerField()
+    category = models.CharField(max_length=100, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'item_type', 'item_id'], name='unique_daily_sales_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.item_type} #{self.item_id} x {self.quantity}"
+
+
+class MenuSearchTerm(models.Model):
+    """Inverted index posting: one row per distinct term of a FoodItem."""
+    term = models.CharField(max_length=64)
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='search_terms')
+    category = models.CharField(max_length=100)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'food_item'], name='unique_menu_search_term'),
+        ]
+        indexes = [
+            # covers the ranking and facet queries so they never touch the table
+            models.Index(fields=['term', 'category', 'food_item', 'weight'], name='menu_search_covering_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.food_item_id} ({self.weight})"
+
+
+class FoodRecommendation(models.Model):
+    """Precomputed "frequently ordered together" neighbour of a FoodItem."""
+    item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    # baskets holding both items, and the share of the item's baskets that also held the neighbour
+    together = models.PositiveIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # also the index order_page reads a whole top-K list from
+            models.UniqueConstraint(fields=['item', 'rank'], name='unique_food_recommendation_rank'),
+        ]
+
     def __str__(self):
-        return f" Feedback From  {self.user.username} on {self.rating}⭐"
\ No newline at end of file
+        return f"{self.item_id} -> {self.recommended_id} (#{self.rank}, {self.score:.2f})"
@@ -0,0 +1,79 @@
+from django.conf import settings
+
+
+DEFAULT_PAGE_SIZE = getattr(settings, 'DASHBOARD_PAGE_SIZE', 20)
+
+
+class KeysetPage:
+    """One page of rows walked newest-first by primary key.
+
+    The cursor in the query string is the id of the last row already shown, so
+    fetching any page is a single indexed ``WHERE id < cursor LIMIT n`` query no
+    matter how deep into the history it is.
+    """
+
+    def __init__(self, object_list, query, param, cursor, next_cursor):
+        self.object_list = object_list
+        self.query = query
+        self.param = param
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor is not None
+
+    def _querystring(self, cursor):
+        # keep the cursors of the other tables so each one pages independently
+        params = self.query.copy()
+        if cursor is None:
+            params.pop(self.param, None)
+        else:
+            params[self.param] = cursor
+        return f"?{params.urlencode()}"
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    @property
+    def first_querystring(self):
+        return self._querystring(None)
+
+
+def keyset_paginate(request, queryset, param, per_page=DEFAULT_PAGE_SIZE):
+    try:
+        cursor = int(request.GET.get(param))
+    except (TypeError, ValueError):
+        cursor = None
+
+    queryset = queryset.order_by('-id')
+    if cursor is not None:
+        queryset = queryset.filter(id__lt=cursor)
+
+    # fetch one extra row to know whether a next page exists
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = rows[-1].id
+
+    return KeysetPage(rows, request.GET, param, cursor, next_cursor)
+
+
+def cursor_slice(queryset, cursor, limit):
+    """Rows after ``cursor`` in ascending id order plus the cursor of the next slice."""
+    rows = list(queryset.filter(id__gt=cursor).order_by('id')[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
@@ -0,0 +1,210 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+LOGIN_RATE_LIMIT_WINDOW = getattr(settings, 'LOGIN_RATE_LIMIT_WINDOW', 300)
+LOGIN_RATE_LIMIT_PER_IP = getattr(settings, 'LOGIN_RATE_LIMIT_PER_IP', 20)
+LOGIN_RATE_LIMIT_PER_USERNAME = getattr(settings, 'LOGIN_RATE_LIMIT_PER_USERNAME', 5)
+LOGIN_RATE_LIMIT_LRU_SIZE = getattr(settings, 'LOGIN_RATE_LIMIT_LRU_SIZE', 10000)
+LOGIN_RATE_LIMIT_TRUST_FORWARDED_FOR = getattr(settings, 'LOGIN_RATE_LIMIT_TRUST_FORWARDED_FOR', False)
+
+KEY_PREFIX = 'food:ratelimit'
+
+
+class LocalCounterStore:
+    """Bounded in-process LRU of expiring counters.
+
+    Only used when the shared cache cannot count, so each worker then limits
+    on its own. The oldest keys are dropped once ``max_entries`` is reached,
+    which keeps a flood of distinct usernames from growing memory.
+    """
+
+    def __init__(self, max_entries=LOGIN_RATE_LIMIT_LRU_SIZE):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def incr(self, key, timeout=None):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._data.pop(key, (0, None))
+            if expires is not None and expires <= now:
+                value, expires = 0, None
+            if value == 0 and timeout is not None:
+                expires = now + timeout
+            self._data[key] = (value + 1, expires)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return value + 1
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    found[key] = entry[0]
+                    self._data.move_to_end(key)
+        return found
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class CacheCounterStore:
+    """Counters kept in the configured Django cache, shared by every worker."""
+
+    def __init__(self, backend=cache):
+        self.backend = backend
+
+    def incr(self, key, timeout=None):
+        self.backend.add(key, 0, timeout)
+        # raises ValueError if the key is gone again, e.g. with the dummy cache
+        return self.backend.incr(key)
+
+    def get_many(self, keys):
+        return self.backend.get_many(keys)
+
+    def delete_many(self, keys):
+        self.backend.delete_many(keys)
+
+
+class FallbackCounterStore:
+    """Use the shared cache, and the local LRU whenever the cache raises.
+
+    After a failure every call goes to the LRU for ``retry_after`` seconds,
+    so reads see the counts that were written while the cache was down.
+    """
+
+    def __init__(self, primary, fallback, retry_after=30):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_after = retry_after
+        self._failed_at = None
+
+    def _call(self, method, *args):
+        if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+            return getattr(self.fallback, method)(*args)
+        try:
+            result = getattr(self.primary, method)(*args)
+        except Exception:
+            logger.warning("Rate limit cache unavailable, counting in process.", exc_info=True)
+            self._failed_at = time.monotonic()
+            return getattr(self.fallback, method)(*args)
+        self._failed_at = None
+        return result
+
+    def incr(self, key, timeout=None):
+        return self._call('incr', key, timeout)
+
+    def get_many(self, keys):
+        return self._call('get_many', keys)
+
+    def delete_many(self, keys):
+        self._call('delete_many', keys)
+
+
+store = FallbackCounterStore(CacheCounterStore(), LocalCounterStore())
+
+
+class SlidingWindowLimiter:
+    """Sliding window counter: at most ``limit`` hits per ``window`` seconds.
+
+    Each identifier gets one counter per fixed window. The previous window's
+    count is weighted by how much of it still overlaps the sliding window,
+    which approximates a true sliding log with two counters and an atomic
+    increment instead of a list of timestamps.
+    """
+
+    def __init__(self, name, limit, window, counters=None):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.counters = store if counters is None else counters
+
+    def _key(self, identifier, bucket):
+        digest = hashlib.sha1(identifier.encode()).hexdigest()
+        return f"{KEY_PREFIX}:{self.name}:{digest}:{bucket}"
+
+    def hit(self, identifier, now=None):
+        """Count one attempt and return whether it is within the limit."""
+        now = time.time() if now is None else now
+        bucket, offset = divmod(now, self.window)
+        current_key = self._key(identifier, int(bucket))
+        previous_key = self._key(identifier, int(bucket) - 1)
+
+        current = self.counters.incr(current_key, self.window * 2)
+        previous = self.counters.get_many([previous_key]).get(previous_key, 0)
+        return previous * (1 - offset / self.window) + current <= self.limit
+
+    def reset(self, identifier, now=None):
+        now = time.time() if now is None else now
+        bucket = int(now // self.window)
+        self.counters.delete_many([self._key(identifier, bucket), self._key(identifier, bucket - 1)])
+
+
+ip_limiter = SlidingWindowLimiter('login-ip', LOGIN_RATE_LIMIT_PER_IP, LOGIN_RATE_LIMIT_WINDOW)
+username_limiter = SlidingWindowLimiter('login-username', LOGIN_RATE_LIMIT_PER_USERNAME, LOGIN_RATE_LIMIT_WINDOW)
+
+REJECTION_KEYS = {
+    'ip': f"{KEY_PREFIX}:rejected:ip",
+    'username': f"{KEY_PREFIX}:rejected:username",
+}
+
+
+def client_ip(request):
+    if LOGIN_RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            # the last entry is the one added by our own proxy
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _username_key(request, username):
+    # per username and client, so failing someone else's password from one
+    # address never locks the real user out; the IP limit covers spraying
+    return f"{username.strip().lower()}|{client_ip(request)}"
+
+
+def login_allowed(request, username):
+    """Count a login attempt against the client IP and the username from that IP.
+
+    Call before ``authenticate()``, so rejected attempts never reach the
+    password hasher. Every rejection is added to the shared counters read
+    by ``rejected_login_counts()``.
+    """
+    ip_ok = ip_limiter.hit(client_ip(request))
+    username_ok = username_limiter.hit(_username_key(request, username))
+    for scope, ok in (('ip', ip_ok), ('username', username_ok)):
+        if not ok:
+            store.incr(REJECTION_KEYS[scope])
+    if not (ip_ok and username_ok):
+        logger.info("Rejected login attempt for %r from %s (ip ok: %s, username ok: %s).",
+                    username, client_ip(request), ip_ok, username_ok)
+        return False
+    return True
+
+
+def clear_login_attempts(request, username):
+    """Forget a username's attempts from this client after it logs in successfully."""
+    username_limiter.reset(_username_key(request, username))
+
+
+def rejected_login_counts():
+    counts = store.get_many(list(REJECTION_KEYS.values()))
+    return {scope: counts.get(key, 0) for scope, key in REJECTION_KEYS.items()}
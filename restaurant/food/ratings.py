@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import FeedBack, RatingCounter
+
+
+RATINGS = range(1, 6)
+
+
+def _empty_counts():
+    return {'count': 0, 'total': 0, **{f"rating_{rating}": 0 for rating in RATINGS}}
+
+
+def _tally(rows):
+    """Sum (scope, object_id, rating, how_many) rows into one set of counts per counter."""
+    counts = defaultdict(_empty_counts)
+    for scope, object_id, rating, how_many in rows:
+        counter = counts[scope, object_id]
+        counter['count'] += how_many
+        counter['total'] += rating * how_many
+        counter[f"rating_{rating}"] += how_many
+    return counts
+
+
+def _feedback_rows(feedbacks):
+    for feedback in feedbacks:
+        rating = int(feedback.rating)
+        yield ('global', 0, rating, 1)
+        yield ('user', feedback.user_id, rating, 1)
+
+
+def _add_to_counter(scope, object_id, deltas):
+    lookup = {'scope': scope, 'object_id': object_id}
+    changes = {field: F(field) + value for field, value in deltas.items() if value}
+    if RatingCounter.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            RatingCounter.objects.create(**deltas, **lookup)
+    except IntegrityError:
+        # another request created the row first, add on top of it
+        RatingCounter.objects.filter(**lookup).update(**changes)
+
+
+def record_ratings(feedbacks):
+    """Add newly written feedback to the global and per-user counters."""
+    with transaction.atomic():
+        # fixed order, so concurrent flushes lock the counter rows the same way
+        for (scope, object_id), deltas in sorted(_tally(_feedback_rows(feedbacks)).items()):
+            _add_to_counter(scope, object_id, deltas)
+
+
+def rebuild_rating_counters():
+    """Recompute every counter from the feedback table."""
+    rows = FeedBack.objects.values('user_id', 'rating').annotate(how_many=Count('id')).order_by()
+    tallied = []
+    for row in rows:
+        tallied.append(('global', 0, row['rating'], row['how_many']))
+        tallied.append(('user', row['user_id'], row['rating'], row['how_many']))
+    counters = [
+        RatingCounter(scope=scope, object_id=object_id, **counts)
+        for (scope, object_id), counts in _tally(tallied).items()
+    ]
+    with transaction.atomic():
+        RatingCounter.objects.all().delete()
+        RatingCounter.objects.bulk_create(counters, batch_size=1000)
+    return len(counters)
+
+
+def rating_summary(scope='global', object_id=0):
+    """Count, average and histogram for one counter, zeros when nothing was rated yet."""
+    counter = RatingCounter.objects.filter(scope=scope, object_id=object_id).first()
+    if counter is None:
+        counter = RatingCounter(scope=scope, object_id=object_id)
+    return {'count': counter.count, 'average': counter.average, 'histogram': counter.histogram}
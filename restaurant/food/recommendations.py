@@ -0,0 +1,105 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import FoodRecommendation, Order
+
+
+RECOMMENDATION_TOP_K = getattr(settings, 'RECOMMENDATION_TOP_K', 6)
+# orders by the same user less than this many seconds apart share a basket
+RECOMMENDATION_BASKET_WINDOW = getattr(settings, 'RECOMMENDATION_BASKET_WINDOW', 2 * 60 * 60)
+RECOMMENDATION_MIN_SUPPORT = getattr(settings, 'RECOMMENDATION_MIN_SUPPORT', 2)
+# baskets turned into a dense 0/1 block per matrix product, bounds memory to chunk x items
+BASKET_CHUNK = 4096
+
+
+def order_baskets(window=RECOMMENDATION_BASKET_WINDOW):
+    """Return (item_ids, basket, column) arrays, one entry per distinct item in a basket.
+
+    Food order lines are sorted by user and time, and a new basket starts
+    whenever the user changes or more than ``window`` seconds passed since
+    their previous line. ``column`` indexes into ``item_ids``; ``basket`` is
+    sorted.
+    """
+    users, items, stamps = [], [], []
+    lines = (Order.objects.filter(item__isnull=False)
+             .order_by('user_id', 'ordered_at')
+             .values_list('user_id', 'item_id', 'ordered_at'))
+    for user_id, item_id, ordered_at in lines.iterator(chunk_size=5000):
+        users.append(user_id)
+        items.append(item_id)
+        stamps.append(ordered_at.timestamp())
+    if not items:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    users = np.asarray(users, dtype=np.int64)
+    stamps = np.asarray(stamps, dtype=np.float64)
+    starts = np.empty(len(users), dtype=bool)
+    starts[0] = True
+    starts[1:] = (users[1:] != users[:-1]) | (np.diff(stamps) > window)
+    basket = np.cumsum(starts) - 1
+
+    item_ids, column = np.unique(np.asarray(items, dtype=np.int64), return_inverse=True)
+    # the same dish twice in one basket counts once
+    cells = np.unique(basket * len(item_ids) + column)
+    return item_ids, cells // len(item_ids), cells % len(item_ids)
+
+
+def co_occurrence(basket, column, n_items, chunk=BASKET_CHUNK):
+    """items x items matrix of how many baskets held both items; the diagonal is
+    how many baskets held the item at all."""
+    counts = np.zeros((n_items, n_items), dtype=np.float64)
+    if not len(basket):
+        return counts
+    n_baskets = int(basket[-1]) + 1
+    for start in range(0, n_baskets, chunk):
+        low, high = np.searchsorted(basket, [start, start + chunk])
+        block = np.zeros((min(chunk, n_baskets - start), n_items), dtype=np.float32)
+        block[basket[low:high] - start, column[low:high]] = 1
+        counts += block.T @ block
+    return counts
+
+
+def top_neighbours(counts, top_k=RECOMMENDATION_TOP_K, min_support=RECOMMENDATION_MIN_SUPPORT):
+    """Yield (row, column, together, score) for each row's best ``top_k`` neighbours.
+
+    The score is the share of the row item's baskets that also held the
+    neighbour; ties go to the pair seen together more often.
+    """
+    n_items = len(counts)
+    if n_items < 2:
+        return
+    occurrences = np.diag(counts).copy()
+    together = counts.copy()
+    np.fill_diagonal(together, 0)
+    together[together < min_support] = 0
+    score = together / np.maximum(occurrences, 1)[:, None]
+
+    order = np.lexsort((-together, -score), axis=-1)[:, :min(top_k, n_items - 1)]
+    best_together = np.take_along_axis(together, order, axis=1)
+    best_score = np.take_along_axis(score, order, axis=1)
+    for row, rank in zip(*np.nonzero(best_together)):
+        yield row, order[row, rank], int(best_together[row, rank]), float(best_score[row, rank])
+
+
+def build_recommendations(top_k=RECOMMENDATION_TOP_K, window=RECOMMENDATION_BASKET_WINDOW,
+                          min_support=RECOMMENDATION_MIN_SUPPORT):
+    """Recompute the whole FoodRecommendation table from order history."""
+    item_ids, basket, column = order_baskets(window)
+    counts = co_occurrence(basket, column, len(item_ids))
+    ranks = {}
+    rows = []
+    for row, neighbour, together, score in top_neighbours(counts, top_k, min_support):
+        ranks[row] = ranks.get(row, 0) + 1
+        rows.append(FoodRecommendation(
+            item_id=int(item_ids[row]),
+            recommended_id=int(item_ids[neighbour]),
+            rank=ranks[row],
+            together=together,
+            score=score,
+        ))
+    with transaction.atomic():
+        FoodRecommendation.objects.all().delete()
+        FoodRecommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
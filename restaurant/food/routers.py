@@ -0,0 +1,69 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+READ_YOUR_WRITES_WINDOW = getattr(settings, 'READ_YOUR_WRITES_WINDOW', 10)
+PIN_COOKIE = 'db_primary'
+
+_request_state = ContextVar('food_db_routing', default=None)
+
+
+class RoutingState:
+    """Routing flags for the request being served.
+
+    The context variable holds this object rather than the flags themselves,
+    so a write made in a sync_to_async thread is seen by the request that
+    started it.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def begin_request(pinned=False):
+    state = RoutingState(pinned)
+    return state, _request_state.set(state)
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send reads made while serving a request to a replica, everything else to the primary.
+
+    Reads stay on the primary once the request has written, inside a
+    transaction on the primary, for READ_YOUR_WRITES_WINDOW seconds after the
+    same client wrote (see ReplicaPinningMiddleware), and outside of requests,
+    so management commands and background flushes read what they just wrote.
+    """
+
+    def __init__(self):
+        self.replicas = list(getattr(settings, 'REPLICA_DATABASES', []))
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if not self.replicas or state is None or state.pinned or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        # select_for_update() and get_or_create() are routed here as well
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema through replication
+        return db not in self.replicas
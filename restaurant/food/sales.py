@@ -0,0 +1,125 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .analytics import invalidate_sales_days, invalidate_sales_report
+from .models import DailySales, Order
+
+
+def _sales_rows(orders):
+    rows = orders.annotate(day=TruncDate('ordered_at')).values(
+        'day', 'item_id', 'item__category', 'gallery_item_id',
+    ).annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(Order.line_total_expression()),
+    ).order_by()
+    for row in rows:
+        if row['item_id'] is not None:
+            yield ('food', row['item_id'], row['item__category'], row)
+        else:
+            yield ('gallery', row['gallery_item_id'], '', row)
+
+
+# rollup keys locked per query; keeps the IN lists and the bulk statements
+# well inside every backend's parameter limits
+ROLLUP_BATCH_SIZE = 200
+
+
+def _lock_rollup_rows(keys):
+    """The existing rollup rows for ``keys``, read and locked ROLLUP_BATCH_SIZE keys at a time.
+
+    Each query narrows with IN lists on day, item type and item id, and the
+    exact keys are matched here, instead of one OR term per key.
+    """
+    keys = sorted(keys)
+    rows = []
+    for start in range(0, len(keys), ROLLUP_BATCH_SIZE):
+        batch = keys[start:start + ROLLUP_BATCH_SIZE]
+        wanted = set(batch)
+        candidates = DailySales.objects.select_for_update().filter(
+            day__in=sorted({day for day, _, _ in batch}),
+            item_type__in=sorted({item_type for _, item_type, _ in batch}),
+            item_id__in=sorted({item_id for _, _, item_id in batch}),
+        )
+        rows += [row for row in candidates if (row.day, row.item_type, row.item_id) in wanted]
+    return rows
+
+
+def _upsert_rollup(totals):
+    """Add ``{(day, item_type, item_id): (category, quantity, revenue)}`` to the rollup.
+
+    The existing rows are read and locked, then updated with a bulk UPDATE
+    and the missing ones inserted with a bulk INSERT, one statement of each
+    per ROLLUP_BATCH_SIZE keys.
+    """
+    while totals:
+        existing = _lock_rollup_rows(totals)
+        for row in existing:
+            _, quantity, revenue = totals.pop((row.day, row.item_type, row.item_id))
+            row.quantity += quantity
+            row.revenue += revenue
+        DailySales.objects.bulk_update(existing, ['quantity', 'revenue'], batch_size=ROLLUP_BATCH_SIZE)
+        if not totals:
+            return
+        try:
+            with transaction.atomic():
+                DailySales.objects.bulk_create([
+                    DailySales(day=day, item_type=item_type, item_id=item_id,
+                               category=category, quantity=quantity, revenue=revenue)
+                    for (day, item_type, item_id), (category, quantity, revenue) in totals.items()
+                ], batch_size=ROLLUP_BATCH_SIZE)
+            return
+        except IntegrityError:
+            # another settlement created some of the rows first, add on top of them
+            continue
+
+
+def record_sales(orders):
+    """Add the given orders to the daily rollup, before they are marked completed."""
+    totals = {
+        (row['day'], item_type, item_id): (category, row['total_quantity'], row['total_revenue'] or 0)
+        for item_type, item_id, category, row in _sales_rows(orders)
+    }
+    if not totals:
+        return
+    days = {day for day, _, _ in totals}
+    with transaction.atomic(savepoint=False):
+        _upsert_rollup(totals)
+        transaction.on_commit(lambda: invalidate_sales_days(days))
+
+
+def complete_pending_orders(orders):
+    """Mark the pending ones among ``orders`` completed and add them to the rollup.
+
+    Every path that completes an order goes through here, so the rollup
+    always matches rebuild_daily_sales. Returns the ids that were completed.
+    """
+    with transaction.atomic(savepoint=False):
+        # locked so a racing call finds them completed and counts nothing twice
+        ids = list(orders.filter(status='Pending').select_for_update(of=('self',)).values_list('id', flat=True))
+        if ids:
+            completed = Order.objects.filter(id__in=ids)
+            record_sales(completed)
+            completed.update(status='Completed', updated_at=timezone.now())
+    return ids
+
+
+def rebuild_daily_sales():
+    """Recompute the whole rollup from completed order history."""
+    rows = [
+        DailySales(
+            day=row['day'],
+            item_type=item_type,
+            item_id=item_id,
+            category=category,
+            quantity=row['total_quantity'],
+            revenue=row['total_revenue'] or 0,
+        )
+        for item_type, item_id, category, row in _sales_rows(Order.objects.filter(status='Completed'))
+    ]
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        DailySales.objects.bulk_create(rows, batch_size=1000)
+        transaction.on_commit(invalidate_sales_report)
+    return len(rows)
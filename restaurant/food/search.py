@@ -0,0 +1,86 @@
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import FoodItem, MenuSearchTerm
+
+
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+STOP_WORDS = frozenset({'a', 'an', 'and', 'in', 'of', 'on', 'or', 'the', 'to', 'with'})
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def _postings(item):
+    weights = Counter()
+    for term in tokenize(item.name):
+        weights[term] += NAME_WEIGHT
+    for term in tokenize(item.description):
+        weights[term] += DESCRIPTION_WEIGHT
+    return [
+        MenuSearchTerm(term=term, food_item_id=item.id, category=item.category, weight=weight)
+        for term, weight in weights.items()
+    ]
+
+
+def index_food_item(item):
+    with transaction.atomic():
+        MenuSearchTerm.objects.filter(food_item_id=item.id).delete()
+        MenuSearchTerm.objects.bulk_create(_postings(item))
+
+
+def rebuild_search_index(batch_size=1000):
+    count = 0
+    with transaction.atomic():
+        MenuSearchTerm.objects.all().delete()
+        batch = []
+        for item in FoodItem.objects.only('id', 'name', 'description', 'category').iterator(chunk_size=batch_size):
+            batch.extend(_postings(item))
+            if len(batch) >= batch_size:
+                count += len(MenuSearchTerm.objects.bulk_create(batch))
+                batch = []
+        count += len(MenuSearchTerm.objects.bulk_create(batch))
+    return count
+
+
+def search_menu(query, category=None, limit=20):
+    """Rank items by how many query terms they contain, then by summed weight.
+
+    Returns ``(items, facets)`` where ``facets`` maps every category to the
+    number of matching items, ignoring the ``category`` filter.
+    """
+    terms = set(tokenize(query))
+    facets = {value: 0 for value, _ in FoodItem.CATEGORY_CHOICE}
+    if not terms:
+        return [], facets
+
+    postings = MenuSearchTerm.objects.filter(term__in=terms)
+    for row in postings.values('category').annotate(items=Count('food_item', distinct=True)).order_by():
+        facets[row['category']] = row['items']
+
+    if category:
+        postings = postings.filter(category=category)
+    ranked = list(
+        postings.values('food_item')
+        .annotate(matched=Count('term'), score=Sum('weight'))
+        .order_by('-matched', '-score', 'food_item')[:limit]
+    )
+    items = FoodItem.objects.in_bulk([row['food_item'] for row in ranked])
+    results = []
+    for row in ranked:
+        item = items[row['food_item']]
+        item.search_score = row['score']
+        results.append(item)
+    return results, facets
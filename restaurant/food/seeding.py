@@ -0,0 +1,148 @@
+import os
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import CustomUser, FeedBack, FoodItem, Gallery, Order, Payments
+
+
+DISH_WORDS = (
+    'paneer', 'chicken', 'mutton', 'tikka', 'masala', 'biryani', 'dosa', 'idli', 'noodles',
+    'manchurian', 'tandoori', 'kebab', 'penne', 'arrabbiata', 'lassi', 'kulfi', 'halwa', 'curry',
+    'fried', 'rice', 'butter', 'naan', 'soup', 'salad', 'chocolate', 'ice-cream', 'mango', 'spicy',
+)
+SEED_PASSWORD = 'seed-password'
+
+
+def _media_files(folder):
+    path = os.path.join(settings.MEDIA_ROOT, folder)
+    if not os.path.isdir(path):
+        return [f"{folder}/placeholder.jpg"]
+    names = sorted(name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name)))
+    return [f"{folder}/{name}" for name in names] or [f"{folder}/placeholder.jpg"]
+
+
+def _spread_over_days(model, field, ids, days, rng):
+    """bulk_create cannot bypass auto_now_add, so move rows back in time afterwards."""
+    if days <= 1 or not ids:
+        return
+    now = timezone.now()
+    buckets = {}
+    for pk in ids:
+        buckets.setdefault(rng.randrange(days), []).append(pk)
+    for day, pks in buckets.items():
+        # chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(pks), 500):
+            model.objects.filter(id__in=pks[start:start + 500]).update(**{field: now - timedelta(days=day)})
+
+
+def _insert(model, rows, batch_size):
+    """bulk_create in batches and return the new ids.
+
+    MySQL does not hand primary keys back from bulk_create, so they are read
+    back as everything above the previous highest id.
+    """
+    last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, len(rows), batch_size):
+        model.objects.bulk_create(rows[start:start + batch_size])
+    return list(model.objects.filter(id__gt=last_id).values_list('id', flat=True))
+
+
+def seed(users=100, food_items=50, gallery=20, orders=1000, gallery_orders=300,
+         payments=300, feedback=200, days=30, batch_size=1000, random_seed=None, stdout=None):
+    """Insert synthetic rows with bulk_create and return how many of each were written.
+
+    Orders, payments and feedback reference the new users and items as well
+    as any that already exist.
+    """
+    rng = random.Random(random_seed)
+    run = uuid.uuid4().hex[:8]
+    counts = {}
+
+    def report(label, ids):
+        counts[label] = len(ids)
+        if stdout is not None:
+            stdout.write(f"  {label}: {len(ids)}")
+
+    # hashing once keeps seeding fast, every seeded user shares SEED_PASSWORD
+    password = make_password(SEED_PASSWORD)
+    report('users', _insert(CustomUser, [
+        CustomUser(username=f"seed_{run}_{n}", email=f"seed_{run}_{n}@example.com", password=password)
+        for n in range(users)
+    ], batch_size))
+
+    categories = [value for value, _ in FoodItem.CATEGORY_CHOICE]
+    food_images = _media_files('food_images')
+    report('food_items', _insert(FoodItem, [
+        FoodItem(
+            name=" ".join(rng.sample(DISH_WORDS, 2)).title(),
+            category=rng.choice(categories),
+            price=Decimal(rng.randrange(5000, 99999)) / 100,
+            description=" ".join(rng.choices(DISH_WORDS, k=8)),
+            image=rng.choice(food_images),
+        )
+        for _ in range(food_items)
+    ], batch_size))
+
+    gallery_images = _media_files('gallery')
+    report('gallery', _insert(Gallery, [
+        Gallery(
+            caption=" ".join(rng.sample(DISH_WORDS, 3)).title(),
+            price=Decimal(rng.randrange(5000, 99999)) / 100,
+            image=rng.choice(gallery_images),
+        )
+        for _ in range(gallery)
+    ], batch_size))
+
+    user_ids = list(CustomUser.objects.values_list('id', flat=True))
+    food_ids = list(FoodItem.objects.values_list('id', flat=True))
+    gallery_ids = list(Gallery.objects.values_list('id', flat=True))
+    statuses = ['Pending', 'Completed']
+    if not user_ids:
+        return counts
+
+    if food_ids:
+        ids = _insert(Order, [
+            Order(user_id=rng.choice(user_ids), item_id=rng.choice(food_ids),
+                  quantity=rng.randint(1, 5), status=rng.choice(statuses))
+            for _ in range(orders)
+        ], batch_size)
+        _spread_over_days(Order, 'ordered_at', ids, days, rng)
+        report('orders', ids)
+
+    if gallery_ids:
+        ids = _insert(Order, [
+            Order(user_id=rng.choice(user_ids), gallery_item_id=rng.choice(gallery_ids),
+                  quantity=rng.randint(1, 3), status=rng.choice(statuses))
+            for _ in range(gallery_orders)
+        ], batch_size)
+        _spread_over_days(Order, 'ordered_at', ids, days, rng)
+        report('gallery_orders', ids)
+
+    methods = [value for value, _ in Payments.PAY_METHOD_CHOICES]
+    ids = _insert(Payments, [
+        Payments(
+            user_id=rng.choice(user_ids), first_name='Seed', last_name=f"User{n}",
+            address=f"{n} Seed Street", country='India', state='Tamil Nadu', pin_code='600001',
+            payment_method=rng.choice(methods), amount=Decimal(rng.randrange(100, 500000)) / 100,
+        )
+        for n in range(payments)
+    ], batch_size)
+    _spread_over_days(Payments, 'created_at', ids, days, rng)
+    report('payments', ids)
+
+    ids = _insert(FeedBack, [
+        FeedBack(user_id=rng.choice(user_ids), message=" ".join(rng.choices(DISH_WORDS, k=6)),
+                 rating=rng.randint(1, 5))
+        for _ in range(feedback)
+    ], batch_size)
+    _spread_over_days(FeedBack, 'created_at', ids, days, rng)
+    report('feedback', ids)
+
+    return counts
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_gallery, invalidate_menu
+from .images import build_in_background, delete_field_derivatives
+from .models import FoodItem, Gallery
+from .search import index_food_item
+
+
+@receiver([post_save, post_delete], sender=FoodItem)
+def food_item_changed(sender, **kwargs):
+    invalidate_menu()
+
+
+@receiver([post_save, post_delete], sender=Gallery)
+def gallery_changed(sender, **kwargs):
+    invalidate_gallery()
+
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_save, sender=Gallery)
+def build_image_derivatives(sender, instance, **kwargs):
+    # built on a background thread once the save has committed, so the admin
+    # request never waits for the resizing; existing variants are skipped
+    if instance.image:
+        storage, name = instance.image.storage, instance.image.name
+        transaction.on_commit(lambda: build_in_background(storage, name))
+
+
+@receiver(pre_save, sender=FoodItem)
+@receiver(pre_save, sender=Gallery)
+def drop_replaced_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and 'image' not in update_fields):
+        return
+    old_name = sender.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+    if old_name and old_name != instance.image.name:
+        storage = instance.image.storage
+        transaction.on_commit(lambda: delete_field_derivatives(storage, old_name))
+
+
+@receiver(post_delete, sender=FoodItem)
+@receiver(post_delete, sender=Gallery)
+def drop_deleted_image_derivatives(sender, instance, **kwargs):
+    if instance.image:
+        storage, name = instance.image.storage, instance.image.name
+        transaction.on_commit(lambda: delete_field_derivatives(storage, name))
+
+
+@receiver(post_save, sender=FoodItem)
+def update_search_index(sender, instance, **kwargs):
+    # postings are removed with the item through the foreign key cascade
+    index_food_item(instance)
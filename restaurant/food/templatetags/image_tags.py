@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from food.images import DERIVATIVE_WIDTHS, derivative_name, derivatives_built
+
+register = template.Library()
+
+
+def _srcset(image, ext):
+    return ", ".join(
+        f"{image.storage.url(derivative_name(image.name, width, ext))} {width}w"
+        for width in DERIVATIVE_WIDTHS
+    )
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', **attrs):
+    """Render ``image`` as a <picture> with WebP and JPEG srcsets.
+
+    Falls back to a plain <img> of the original upload until its derivatives
+    have been built, which is looked up in the cache rather than storage.
+    """
+    extra = format_html_join(' ', '{}="{}"', attrs.items())
+    if not derivatives_built(image.storage, image.name):
+        return format_html('<img src="{}" {}>', image.url, extra)
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}>'
+        '</picture>',
+        _srcset(image, 'webp'), sizes,
+        image.storage.url(derivative_name(image.name, DERIVATIVE_WIDTHS[1], 'jpg')), _srcset(image, 'jpg'), sizes, extra,
+    )
@@ -1,3 +1,1289 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.utils import ConnectionDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router as db_router
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import feed, media
+from .analytics import sales_report
+from .benchmark import ROUTES, run_benchmarks
+from .buffers import WriteBuffer
+from .catalog import catalog_etag, get_gallery_images, get_menu_items
+from .cart import settle_cart
+from .checks import check_session_cache
+from .feed import ChangeNotifier, current_cursor, decode_cursor, encode_cursor, fetch_changes, wait_for_changes
+from .images import build_field_derivatives, derivative_name, derivative_names, wait_for_builds
+from .budgets import QUERY_BUDGETS, query_budget
+from .models import (
+    ContactMessage, CustomUser, DailySales, FeedBack, FoodItem, FoodRecommendation, Gallery, Order, Payments,
+    MenuSearchTerm, RatingCounter,
+)
+from .middleware import QueryBudgetMiddleware, ReplicaPinningMiddleware
+from .pagination import cursor_slice
+from .ratelimit import LocalCounterStore, SlidingWindowLimiter, rejected_login_counts, username_limiter
+from .ratings import rating_summary, rebuild_rating_counters, record_ratings
+from .recommendations import build_recommendations
+from .routers import PIN_COOKIE, PrimaryReplicaRouter, begin_request, end_request
+from .sales import rebuild_daily_sales, record_sales
+from .search import rebuild_search_index, search_menu
+from .seeding import seed
+from .urls import app_name
+from .userimport import _taken, import_users
+
+
+class AdminDashboardTests(TestCase):
+    """Dashboard tables page by id independently, and the KPIs come from one aggregate."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'secret', user_type='admin')
+        cls.dish = FoodItem.objects.create(name='Dal', category='veg', price='12.50', image='food_images/x.jpg')
+        cls.photo = Gallery.objects.create(caption='Thali', price='40.00', image='gallery/x.jpg')
+        Order.objects.bulk_create(
+            [Order(user=cls.admin, item=cls.dish, quantity=n % 3 + 1) for n in range(45)]
+            + [Order(user=cls.admin, gallery_item=cls.photo, quantity=n % 2 + 1) for n in range(7)]
+        )
+        # every row shares one timestamp, only the id tells them apart
+        Order.objects.update(ordered_at=timezone.make_aware(datetime(2025, 6, 1, 12)))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def dashboard(self, query=''):
+        response = self.client.get(reverse('food:admin_dashboard') + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    def test_pages_walk_every_row_once(self):
+        seen, query = [], ''
+        while True:
+            page = self.dashboard(query)['orders']
+            seen += [order.id for order in page]
+            if not page.has_next:
+                break
+            query = page.next_querystring
+        food_ids = list(Order.objects.filter(item__isnull=False).order_by('-id').values_list('id', flat=True))
+        self.assertEqual(seen, food_ids)
+        self.assertEqual(len(food_ids), 45)
+
+    def test_each_table_keeps_its_own_cursor(self):
+        first = self.dashboard()['orders']
+        context = self.dashboard(first.next_querystring + '&food_page=999999')
+        food_ids = list(Order.objects.filter(item__isnull=False).order_by('-id').values_list('id', flat=True))
+        self.assertEqual([order.id for order in context['orders']], food_ids[20:40])
+        self.assertEqual(len(context['gallery_orders']), 7)
+        self.assertFalse(context['gallery_orders'].has_previous)
+        self.assertEqual(list(context['food_items']), [self.dish])
+        # following one table's link keeps the other cursors in the query string
+        self.assertIn('food_page=999999', context['orders'].next_querystring)
+        self.assertNotIn('orders_page', context['orders'].first_querystring)
+
+    def test_bad_cursors_fall_back_to_the_first_page(self):
+        first = [order.id for order in self.dashboard()['orders']]
+        for cursor in ('abc', '', '1.5'):
+            with self.subTest(cursor=cursor):
+                page = self.dashboard(f'?orders_page={cursor}')['orders']
+                self.assertEqual([order.id for order in page], first)
+                self.assertFalse(page.has_previous)
+        self.assertEqual(self.client.get(reverse('food:api_menu'), {'cursor': 'abc'}).status_code, 400)
+
+    def test_kpis_match_the_per_row_sums(self):
+        context = self.dashboard()
+        orders = list(Order.objects.select_related('item', 'gallery_item'))
+        self.assertEqual(context['total_revenue'], sum(order.total_price for order in orders))
+        self.assertEqual(context['total_food_orders'], 45)
+        self.assertEqual(context['total_gallery_orders'], 7)
+        self.assertEqual(context['total_users'], 1)
+
+    def test_cursor_slice_continues_where_the_last_slice_stopped(self):
+        items = [self.dish] + [
+            FoodItem.objects.create(name=f'Dish {n}', category='veg', price=10, image='food_images/x.jpg')
+            for n in range(4)
+        ]
+        seen, cursor = [], 0
+        while cursor is not None:
+            rows, cursor = cursor_slice(FoodItem.objects.all(), cursor, 2)
+            seen += rows
+        self.assertEqual(seen, items)
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite specific")
+class HotQueryIndexTests(TestCase):
+    """The hot filters and listings must be answered from an index, not a table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('plan', 'plan@example.com', 'secret')
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return " | ".join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.query_plan(queryset)
+        self.assertIn(index_name, plan, plan)
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, plan)
+
+    def test_pending_orders_by_user(self):
+        self.assertUsesIndex(Order.objects.filter(user=self.user, status='Pending'), 'order_user_status_idx')
+
+    def test_feedback_by_user_newest_first(self):
+        self.assertUsesIndex(
+            FeedBack.objects.filter(user=self.user).order_by('-created_at'), 'feedback_user_created_idx',
+        )
+
+    def test_orders_by_ordered_at(self):
+        self.assertUsesIndex(Order.objects.order_by('-ordered_at')[:20], 'order_ordered_at_idx')
+
+    def test_messages_by_sent_at(self):
+        self.assertUsesIndex(ContactMessage.objects.order_by('-sent_at')[:20], 'contact_sent_at_idx')
+
+    def test_import_email_lookup(self):
+        plan = self.query_plan(_taken(['someone'], ['Someone@Example.com']))
+        self.assertIn('customuser_email_lower_idx', plan, plan)
+
+    def test_payments_in_a_date_range(self):
+        since = timezone.now() - timedelta(days=7)
+        plan = self.query_plan(Payments.objects.filter(created_at__gte=since, created_at__lt=timezone.now()))
+        self.assertIn('payments_created_at_idx', plan, plan)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'secret', user_type='admin')
+        for day, method in [(date(2025, 6, 1), 'credit'), (date(2025, 6, 2), 'debit'), (date(2025, 6, 3), 'upi')]:
+            payment = Payments.objects.create(
+                user=cls.admin, first_name='Dee', last_name='Ner', address='1 Main Road', country='India',
+                state='Tamil Nadu', pin_code='600001', payment_method=method, amount=10,
+                bank_on_card='SECRET BANK', card_number='4111111111111111', expiration_date='12/30', cvv='123',
+            )
+            Payments.objects.filter(pk=payment.pk).update(created_at=timezone.make_aware(datetime(
+                day.year, day.month, day.day, 23, 30)))
+
+    def export(self, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('food:export_data', args=['payments']), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_budget_covers_the_streamed_queries(self):
+        self.client.force_login(self.admin)
+        # enough for the session and user lookups, not for the export itself
+        with patch.dict(QUERY_BUDGETS, {'food:export_data': 1}):
+            with self.assertNoLogs('food.queries', 'WARNING'):
+                response = self.client.get(reverse('food:export_data', args=['payments']))
+            with self.assertLogs('food.queries', 'WARNING') as logs:
+                b''.join(response.streaming_content)
+        self.assertIn('food:export_data', logs.output[0])
+
+    def test_payments_leave_out_card_fields(self):
+        body = self.export(format='ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 3)
+        for field in ('bank_on_card', 'card_number', 'expiration_date', 'cvv'):
+            self.assertNotIn(field, rows[0])
+        for secret in ('SECRET BANK', '4111111111111111', '12/30', '123,'):
+            self.assertNotIn(secret, self.export())
+
+    def test_date_range_is_inclusive(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(start='2025-06-02', end='2025-06-03'))))
+        self.assertEqual([row['payment_method'] for row in rows], ['debit', 'upi'])
+        rows = list(csv.DictReader(io.StringIO(self.export(end='2025-06-01'))))
+        self.assertEqual([row['payment_method'] for row in rows], ['credit'])
+
+    def test_rejects_bad_dates(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('food:export_data', args=['payments']), {'start': 'June'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CompleteOrdersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'secret', user_type='admin')
+        cls.dish = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        cls.photo = Gallery.objects.create(caption='Thali', price=25, image='gallery/x.jpg')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.food = Order.objects.create(user=self.admin, item=self.dish)
+        self.gallery = Order.objects.create(user=self.admin, gallery_item=self.photo)
+        self.done = Order.objects.create(user=self.admin, item=self.dish, status='Completed')
+
+    def complete(self, **data):
+        return self.client.post(reverse('food:complete_orders'), data)
+
+    def test_completes_only_pending_orders_once(self):
+        ids = [self.food.id, self.gallery.id, self.done.id]
+        self.assertEqual(self.complete(ids=ids).json(), {'completed': 2, 'ids': [self.food.id, self.gallery.id]})
+        self.assertEqual(self.complete(ids=ids).json(), {'completed': 0, 'ids': []})
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'Completed'})
+        self.assertEqual(sum(DailySales.objects.values_list('quantity', flat=True)), 2)
+
+    def test_kind_and_before_narrow_the_orders(self):
+        response = self.complete(kind='gallery', before=(timezone.now() + timedelta(minutes=1)).isoformat())
+        self.assertEqual(response.json()['ids'], [self.gallery.id])
+        self.assertEqual(self.complete(before='2000-01-01T00:00:00').json()['completed'], 0)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.complete().status_code, 400)
+        self.assertEqual(self.complete(ids=['x']).status_code, 400)
+        self.assertEqual(self.complete(ids=[self.food.id], kind='drinks').status_code, 400)
+        self.assertEqual(self.complete(before='yesterday').status_code, 400)
+        self.client.force_login(CustomUser.objects.create_user('guest', 'guest@example.com', 'secret'))
+        self.assertEqual(self.complete(ids=[self.food.id]).status_code, 403)
+        self.client.logout()
+        response = self.complete(ids=[self.food.id])
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': "Log in first."})
+        self.assertEqual(Order.objects.filter(status='Pending').count(), 2)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCompleteOrdersTests(TransactionTestCase):
+
+    def test_racing_calls_complete_each_order_once(self):
+        admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'secret', user_type='admin')
+        dish = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        ids = [Order.objects.create(user=admin, item=dish).id for _ in range(20)]
+        barrier = threading.Barrier(2)
+        answers = []
+
+        def call():
+            try:
+                client = Client()
+                client.force_login(admin)
+                barrier.wait()
+                answers.append(client.post(reverse('food:complete_orders'), {'ids': ids}).json())
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(answer['completed'] for answer in answers), [0, 20])
+        self.assertEqual(sorted(sum((answer['ids'] for answer in answers), [])), ids)
+        self.assertEqual(DailySales.objects.get().quantity, 20)
+
+
+class CatalogCacheTests(TestCase):
+    """The home page menu and gallery come from the cache until an admin edit drops them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dish = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        cls.photo = Gallery.objects.create(caption='Thali', price=25, image='gallery/x.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_cache_serves_the_home_page_without_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('food:main'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('food:main'))
+        self.assertEqual(response.context['food_items'], [self.dish])
+        self.assertEqual(response.context['gallery_images'], [self.photo])
+
+    def test_edits_invalidate_the_cached_catalog(self):
+        self.client.get(reverse('food:main'))
+        self.dish.name = 'Dal Makhani'
+        self.dish.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('food:main'))
+        self.assertContains(response, 'Dal Makhani')
+
+        self.photo.delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('food:main'))
+        self.assertEqual(response.context['gallery_images'], [])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('food:main'))
+
+
+class CatalogApiConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dish = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matching_etag_is_answered_with_304(self):
+        for name in ('food:api_menu', 'food:api_gallery'):
+            with self.subTest(view=name):
+                etag = self.client.get(reverse(name))['ETag']
+                response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_etag_changes_after_an_edit(self):
+        etag = self.client.get(reverse('food:api_menu'))['ETag']
+        self.dish.price = 12
+        self.dish.save()
+        response = self.client.get(reverse('food:api_menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['price'], '12.00')
+        # the query string is part of the representation
+        self.assertNotEqual(self.client.get(reverse('food:api_menu'), {'category': 'veg'})['ETag'], response['ETag'])
+
+    def test_every_worker_sees_an_edit(self):
+        first = self.client.get(reverse('food:api_menu'))
+        self.dish.name = 'Dal Tadka'
+        self.dish.save()
+        # another worker's cache never saw the edit
+        cache.clear()
+        response = self.client.get(reverse('food:api_menu'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['name'], 'Dal Tadka')
+        # and any worker hands out the same validators for the same content
+        cache.clear()
+        again = self.client.get(reverse('food:api_menu'))
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(again['Last-Modified'], response['Last-Modified'])
+
+
+class MenuSearchTests(TestCase):
+    """Items ranked by matched terms then summed weight, with category facets."""
+
+    def setUp(self):
+        def dish(name, category, description=''):
+            return FoodItem.objects.create(name=name, category=category, description=description, price=10,
+                                           image='food_images/x.jpg')
+
+        # paneer 3 + masala 3 from the name
+        self.paneer = dish('Paneer Butter Masala', 'veg')
+        # masala 3 from the name, paneer 1 from the description
+        self.chicken = dish('Chicken Masala', 'non-veg', 'no paneer here')
+        # masala 3 from the name and 1 for each mention in the description
+        self.dosa = dish('Masala Dosa', 'veg', 'masala masala')
+        self.chai = dish('Masala Chai', 'drinks')
+
+    def names(self, *args, **kwargs):
+        items, _ = search_menu(*args, **kwargs)
+        return [(item.name, item.search_score) for item in items]
+
+    def test_ranks_by_matched_terms_then_weight(self):
+        self.assertEqual(self.names('paneer masala'), [
+            ('Paneer Butter Masala', 6), ('Chicken Masala', 4), ('Masala Dosa', 5), ('Masala Chai', 3),
+        ])
+        # stop words are dropped, equal scores go to the older item
+        self.assertEqual(self.names('the masala', limit=2), [('Masala Dosa', 5), ('Paneer Butter Masala', 3)])
+        self.assertEqual(search_menu('the of', category='veg'), ([], {
+            'veg': 0, 'non-veg': 0, 'drinks': 0, 'dessert': 0,
+        }))
+
+    def test_category_filter_keeps_every_facet(self):
+        items, facets = search_menu('paneer masala', category='veg')
+        self.assertEqual(items, [self.paneer, self.dosa])
+        self.assertEqual(facets, {'veg': 2, 'non-veg': 1, 'drinks': 1, 'dessert': 0})
+
+        response = self.client.get(reverse('food:api_search'), {'q': 'paneer masala', 'category': 'veg'})
+        self.assertEqual([row['name'] for row in response.json()['results']], ['Paneer Butter Masala', 'Masala Dosa'])
+        self.assertEqual(response.json()['facets'], facets)
+        self.assertEqual(self.client.get(reverse('food:api_search'), {'category': 'soup'}).status_code, 400)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.chai.name = 'Ginger Chai'
+        self.chai.save()
+        self.assertEqual(self.names('ginger'), [('Ginger Chai', 3)])
+        self.assertNotIn('Ginger Chai', [name for name, _ in self.names('masala')])
+
+        self.paneer.delete()
+        self.assertEqual(self.names('paneer'), [('Chicken Masala', 1)])
+
+    def test_rebuild_command_restores_the_index(self):
+        expected = self.names('paneer masala')
+        MenuSearchTerm.objects.all().delete()
+        self.assertEqual(self.names('paneer masala'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertEqual(self.names('paneer masala'), expected)
+        self.assertIn(f"Indexed {MenuSearchTerm.objects.count()} menu search terms.", out.getvalue())
+
+
+class MergeGalleryOrdersMigrationTests(TransactionTestCase):
+    """0005 copies gallery orders into Order and its reverse splits them out again."""
+
+    before = [('food', '0004_menusearchterm')]
+    after = [('food', '0005_merge_gallery_orders_into_order')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        apps = self.migrate(self.before)
+        self.addCleanup(lambda: self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes()))
+
+        user = apps.get_model('food', 'CustomUser').objects.create(username='old', email='old@example.com')
+        dish = apps.get_model('food', 'FoodItem').objects.create(name='Dal', category='veg', price=10, image='x.jpg')
+        photo = apps.get_model('food', 'Gallery').objects.create(caption='Thali', price=25, image='g.jpg')
+        apps.get_model('food', 'Order').objects.create(user=user, item=dish, quantity=1)
+        GalleryOrder = apps.get_model('food', 'GalleryOrder')
+        self.placed = timezone.make_aware(datetime(2025, 6, 1, 12))
+        for quantity, status in [(2, 'Pending'), (3, 'Completed')]:
+            GalleryOrder.objects.create(user=user, gallery_item=photo, quantity=quantity, status=status)
+        GalleryOrder.objects.update(ordered_at=self.placed)
+
+    def test_forward_copies_rows_and_backward_restores_them(self):
+        Order = self.migrate(self.after).get_model('food', 'Order')
+        self.assertEqual(Order.objects.filter(item__isnull=False).count(), 1)
+        self.assertEqual(
+            list(Order.objects.filter(gallery_item__isnull=False).order_by('id')
+                 .values_list('gallery_item__caption', 'quantity', 'status', 'ordered_at')),
+            [('Thali', 2, 'Pending', self.placed), ('Thali', 3, 'Completed', self.placed)],
+        )
+
+        apps = self.migrate(self.before)
+        self.assertEqual(apps.get_model('food', 'Order').objects.count(), 1)
+        self.assertEqual(
+            list(apps.get_model('food', 'GalleryOrder').objects.order_by('id')
+                 .values_list('quantity', 'status', 'ordered_at')),
+            [(2, 'Pending', self.placed), (3, 'Completed', self.placed)],
+        )
+
+
+class QueryBudgetTests(TestCase):
+    """Every view must stay within its budget and not run more queries as the tables grow."""
+
+    SIZES = [
+        dict(users=5, food_items=5, gallery=2, orders=10, gallery_orders=5, payments=5, feedback=5),
+        dict(users=50, food_items=40, gallery=25, orders=500, gallery_orders=200, payments=100, feedback=100),
+        dict(users=100, food_items=100, gallery=50, orders=2000, gallery_orders=500, payments=300, feedback=300),
+    ]
+
+    def test_views_stay_within_budget_at_every_size(self):
+        counts = []
+        for size in self.SIZES:
+            seed(days=5, random_seed=1, **size)
+            rebuild_search_index()
+            results = run_benchmarks(iterations=1, warmup=1)
+            counts.append({name: row['queries_max'] for name, row in results.items()})
+
+        for name, route in ROUTES.items():
+            view_name = f"{app_name}:{route.view or name}"
+            with self.subTest(route=name):
+                per_size = [size_counts[name] for size_counts in counts]
+                self.assertLessEqual(max(per_size), query_budget(view_name, route.method.upper()), per_size)
+                self.assertEqual(len(set(per_size)), 1, f"query count grows with data: {per_size}")
+
+    def test_middleware_logs_requests_over_budget(self):
+        # below zero even with the db session engine's extra query
+        with patch.dict(QUERY_BUDGETS, {'food:about_page': -2}):
+            with self.assertLogs('food.queries', 'WARNING') as logs:
+                self.client.get(reverse('food:about_page'))
+        self.assertIn('food:about_page', logs.output[0])
+
+    async def test_middleware_keeps_async_views_async(self):
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(QueryBudgetMiddleware(view)))
+        self.assertFalse(iscoroutinefunction(QueryBudgetMiddleware(lambda request: HttpResponse())))
+        with patch.dict(QUERY_BUDGETS, {'food:contact': -2}):
+            with self.assertLogs('food.queries', 'WARNING') as logs:
+                await self.async_client.get(reverse('food:contact'))
+        self.assertIn('food:contact', logs.output[0])
+
+
+class SessionEngineTests(TestCase):
+    """cached_db saves the session read, but only a shared cache may back it."""
+
+    def setUp(self):
+        caches['sessions'].clear()
+        self.user = CustomUser.objects.create_user('diner', 'diner@example.com', 'secret')
+
+    def queries(self, engine):
+        with self.settings(SESSION_ENGINE=engine):
+            client = Client()
+            client.force_login(self.user)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(reverse('food:feedback')).status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_cached_db_reads_the_session_from_the_cache(self):
+        from_db = self.queries('django.contrib.sessions.backends.db')
+        from_cache = self.queries('django.contrib.sessions.backends.cached_db')
+        self.assertEqual(len(from_db), len(from_cache) + 1)
+        self.assertTrue(any('django_session' in sql for sql in from_db))
+        self.assertFalse(any('django_session' in sql for sql in from_cache))
+
+    def test_warns_about_a_cached_session_engine_on_a_per_process_cache(self):
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+            self.assertEqual([warning.id for warning in check_session_cache(None)], ['food.W001'])
+            shared = {**settings.CACHES, 'sessions': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir(),
+            }}
+            with self.settings(CACHES=shared):
+                self.assertEqual(check_session_cache(None), [])
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertEqual(check_session_cache(None), [])
+
+
+class LoginRateLimitTests(TestCase):
+    """Excess login attempts are turned away before the password is hashed."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('diner', 'diner@example.com', 'right-password')
+
+    def attempt(self, password, ip='10.0.0.1'):
+        return self.client.post(reverse('food:login'), {
+            'username': 'diner', 'password': password, 'user_type': 'user',
+        }, REMOTE_ADDR=ip)
+
+    def test_rejects_attempts_over_the_username_limit_without_hashing(self):
+        for _ in range(username_limiter.limit):
+            self.assertEqual(self.attempt('wrong').status_code, 200)
+        with patch('food.views.authenticate') as authenticate:
+            response = self.attempt('right-password')
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+        self.assertEqual(rejected_login_counts(), {'ip': 0, 'username': 1})
+
+    def test_failures_from_elsewhere_do_not_lock_the_user_out(self):
+        for n in range(username_limiter.limit * 2):
+            self.attempt('wrong', ip=f"10.0.0.{n}")
+        self.assertEqual(self.attempt('right-password', ip='10.0.1.1').status_code, 302)
+        self.assertEqual(rejected_login_counts(), {'ip': 0, 'username': 0})
+
+    def test_successful_login_clears_the_username_window(self):
+        for _ in range(username_limiter.limit - 1):
+            self.attempt('wrong')
+        self.assertEqual(self.attempt('right-password').status_code, 302)
+        self.client.logout()
+        self.assertEqual(self.attempt('wrong').status_code, 200)
+
+    def test_window_slides_and_local_store_stays_bounded(self):
+        limiter = SlidingWindowLimiter('test', limit=2, window=60, counters=LocalCounterStore(max_entries=4))
+        self.assertTrue(limiter.hit('a', now=0))
+        self.assertTrue(limiter.hit('a', now=30))
+        self.assertFalse(limiter.hit('a', now=45))
+        # 110s in, the first window's three hits only count for a sixth
+        self.assertTrue(limiter.hit('a', now=110))
+        for name in 'bcdef':
+            limiter.hit(name, now=110)
+        self.assertEqual(len(limiter.counters), 4)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTests(TestCase):
+
+    def test_skips_conflicts_with_one_lookup_per_batch(self):
+        CustomUser.objects.create_user('taken', 'taken@example.com', 'secret')
+        records = [{'username': f"new{n}", 'email': f"new{n}@example.com", 'password': 'pw'} for n in range(5)]
+        records += [
+            {'username': 'taken', 'email': 'fresh@example.com', 'password': 'pw'},
+            {'username': 'fresh', 'email': 'new0@EXAMPLE.com', 'password': 'pw'},
+            {'username': 'nobody', 'email': ''},
+            {'username': 'admin1', 'email': 'admin1@example.com', 'user_type': 'admin'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            counts = import_users(records, batch_size=4, workers=1)
+
+        self.assertEqual(counts, {'imported': 6, 'conflicts': 2, 'invalid': 1})
+        lookups = [q for q in queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(lookups), 3)
+        self.assertTrue(CustomUser.objects.get(username='new3').check_password('pw'))
+        admin = CustomUser.objects.get(username='admin1')
+        self.assertEqual(admin.user_type, 'admin')
+        self.assertFalse(admin.has_usable_password())
+
+    def test_emails_differing_only_in_case_conflict(self):
+        CustomUser.objects.create_user('taken', 'Taken.Person@example.com', 'secret')
+        counts = import_users([
+            {'username': 'foo', 'email': 'Foo@x.com'},
+            {'username': 'foo2', 'email': 'foo@X.COM'},
+            {'username': 'copycat', 'email': 'taken.person@EXAMPLE.com'},
+        ], workers=1)
+        self.assertEqual(counts, {'imported': 1, 'conflicts': 2, 'invalid': 0})
+        self.assertEqual(CustomUser.objects.get(username='foo').email, 'Foo@x.com')
+
+    def test_rows_the_field_validators_reject_are_reported(self):
+        stderr = io.StringIO()
+        counts = import_users([
+            {'username': 'u' * 151, 'email': 'long@example.com'},
+            {'username': 'two words', 'email': 'words@example.com'},
+            {'username': 'mailless', 'email': 'not-an-email'},
+            {'username': 'huge', 'email': f"{'x' * 250}@example.com"},
+            {'username': 'numeric', 'email': 'numeric@example.com', 'password': 12345},
+            {'username': 'chef', 'email': 'chef@example.com', 'user_type': 'chef'},
+            ['not', 'a', 'record'],
+            {'username': 'fine', 'email': 'fine@example.com', 'password': 'pw'},
+        ], workers=1, stderr=stderr)
+        self.assertEqual(counts, {'imported': 1, 'conflicts': 0, 'invalid': 7})
+        self.assertEqual(list(CustomUser.objects.values_list('username', flat=True)), ['fine'])
+        report = stderr.getvalue()
+        self.assertIn("Skipped row 1: username: Ensure this value has at most 150 characters", report)
+        self.assertIn("Skipped row 3: email: Enter a valid email address.", report)
+        self.assertIn("Skipped row 5: password must be a string", report)
+
+
+class RatingCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = CustomUser.objects.create_user('alice', 'alice@example.com', 'secret')
+        cls.bob = CustomUser.objects.create_user('bob', 'bob@example.com', 'secret')
+
+    def test_buffered_feedback_updates_counters_like_a_rebuild(self):
+        buffer = WriteBuffer(FeedBack, max_size=100, on_flush=record_ratings)
+        for user, rating in [(self.alice, 5), (self.alice, 3), (self.bob, 4)]:
+            buffer.add(FeedBack(user=user, message="ok", rating=rating))
+        self.assertEqual(buffer.flush(), 3)
+        buffer.add(FeedBack(user=self.bob, message="ok", rating=5))
+        buffer.flush()
+
+        overall = rating_summary()
+        self.assertEqual(overall['count'], 4)
+        self.assertEqual(overall['average'], 4.25)
+        self.assertEqual(overall['histogram'], {1: 0, 2: 0, 3: 1, 4: 1, 5: 2})
+        self.assertEqual(rating_summary('user', self.alice.pk)['average'], 4)
+
+        incremental = set(RatingCounter.objects.values_list('scope', 'object_id', 'count', 'total', 'rating_5'))
+        self.assertEqual(rebuild_rating_counters(), 3)
+        rebuilt = set(RatingCounter.objects.values_list('scope', 'object_id', 'count', 'total', 'rating_5'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_failed_counter_update_keeps_the_batch_queued(self):
+        buffer = WriteBuffer(FeedBack, max_size=100, on_flush=record_ratings)
+        buffer.add(FeedBack(user=self.alice, message="ok", rating=2))
+        with patch('food.ratings._add_to_counter', side_effect=RuntimeError), self.assertLogs('food.buffers'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertFalse(FeedBack.objects.exists())
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(rating_summary('user', self.alice.pk)['count'], 1)
+
+
+class WriteBufferTests(TransactionTestCase):
+    """Failed flushes neither block later rows nor grow the queue without bound."""
+
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user('alice', 'alice@example.com', 'secret')
+
+    def buffer(self, **options):
+        buffer = WriteBuffer(FeedBack, max_size=100, max_delay=60, on_flush=record_ratings, **options)
+        self.addCleanup(lambda: buffer._timer and buffer._timer.cancel())
+        return buffer
+
+    def test_rows_violating_a_constraint_are_dropped_and_the_rest_written(self):
+        ghost = CustomUser.objects.create_user('ghost', 'ghost@example.com', 'secret')
+        buffer = self.buffer()
+        buffer.add(FeedBack(user=self.alice, message="ok", rating=4))
+        buffer.add(FeedBack(user_id=ghost.pk, message="ok", rating=1))
+        buffer.add(FeedBack(user=self.alice, message="ok", rating=2))
+        ghost.delete()
+
+        with self.assertLogs('food.buffers', 'WARNING') as logs:
+            self.assertEqual(buffer.flush(), 2)
+        self.assertIn('row by row', logs.output[0])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(FeedBack.objects.count(), 2)
+        self.assertEqual(rating_summary()['count'], 2)
+
+    def test_failing_rows_are_retried_a_bounded_number_of_times(self):
+        buffer = self.buffer(max_retries=1)
+        buffer.add(FeedBack(user=self.alice, message="ok", rating=2))
+        with patch('food.ratings._add_to_counter', side_effect=RuntimeError), self.assertLogs('food.buffers'):
+            self.assertEqual(buffer.flush(), 0)
+            # re-armed, so the kept rows are retried without another request
+            self.assertIsNotNone(buffer._timer)
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 0)
+        self.assertIsNone(buffer._timer)
+        self.assertFalse(FeedBack.objects.exists())
+
+    def test_queue_keeps_the_newest_rows_when_full(self):
+        buffer = self.buffer(max_pending=3)
+        with self.assertLogs('food.buffers', 'ERROR'):
+            for rating in range(1, 6):
+                buffer.add(FeedBack(user=self.alice, message="ok", rating=rating))
+        self.assertEqual(len(buffer), 3)
+        buffer.flush()
+        self.assertEqual(sorted(FeedBack.objects.values_list('rating', flat=True)), [3, 4, 5])
+
+
+class RecommendationTests(TestCase):
+
+    def test_items_ordered_in_the_same_basket_recommend_each_other(self):
+        dal, rice, lassi, cake = [
+            FoodItem.objects.create(name=name, category='veg', price=10, image='food_images/x.jpg')
+            for name in ('Dal', 'Rice', 'Lassi', 'Cake')
+        ]
+        start = timezone.now() - timedelta(days=5)
+        baskets = [
+            # user, minutes after start, items
+            ('ann', 0, [dal, rice, lassi]),
+            ('ann', 10, [dal]),              # same basket as above, counted once
+            ('ann', 600, [cake, lassi]),     # hours later: a new basket
+            ('ben', 0, [dal, rice]),
+            ('ben', 900, [rice, lassi]),
+            ('cat', 0, [cake]),
+        ]
+        users = {}
+        for username, minutes, items in baskets:
+            if username not in users:
+                users[username] = CustomUser.objects.create_user(username, f"{username}@example.com", 'secret')
+            for item in items:
+                order = Order.objects.create(user=users[username], item=item)
+                Order.objects.filter(pk=order.pk).update(ordered_at=start + timedelta(minutes=minutes))
+
+        build_recommendations(top_k=2, window=60 * 60, min_support=2)
+
+        def neighbours(item):
+            return list(FoodRecommendation.objects.filter(item=item).order_by('rank')
+                        .values_list('recommended__name', 'together'))
+
+        self.assertEqual(neighbours(dal), [('Rice', 2)])
+        self.assertEqual(neighbours(rice), [('Dal', 2), ('Lassi', 2)])
+        self.assertEqual(neighbours(cake), [])
+        self.assertEqual(FoodRecommendation.objects.get(item=dal, rank=1).score, 1.0)
+
+        self.client.force_login(users['cat'])
+        response = self.client.get(reverse('food:order_page', args=[rice.id]))
+        self.assertEqual([r.recommended for r in response.context['recommendations']], [dal, lassi])
+
+
+@patch('food.feed.ORDER_FEED_SETTLE', 0)
+class OrderFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('chef', 'chef@example.com', 'secret', user_type='admin')
+        cls.dish = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.old = Order.objects.create(user=self.admin, item=self.dish)
+        self.cursor = encode_cursor(current_cursor())
+        self.new = Order.objects.create(user=self.admin, item=self.dish, quantity=2)
+        Order.objects.filter(pk=self.old.pk).update(status='Completed', updated_at=timezone.now())
+
+    def test_long_poll_returns_rows_changed_after_the_cursor(self):
+        response = self.client.get(reverse('food:order_feed'), {'cursor': self.cursor, 'timeout': 0})
+        result = response.json()
+        self.assertEqual([(o['id'], o['status']) for o in result['orders']],
+                         [(self.new.id, 'Pending'), (self.old.id, 'Completed')])
+
+        response = self.client.get(reverse('food:order_feed'), {'cursor': result['cursor'], 'timeout': 0})
+        self.assertEqual(response.json()['orders'], [])
+
+    async def test_event_stream_resumes_from_last_event_id(self):
+        await self.async_client.aforce_login(self.admin)
+        with patch('food.feed.ORDER_FEED_STREAM_SECONDS', 0.01), patch('food.feed.ORDER_FEED_INTERVAL', 0):
+            response = await self.async_client.get(reverse('food:order_feed'), headers={
+                'Accept': 'text/event-stream', 'Last-Event-ID': self.cursor,
+            })
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f"retry: 3000\nid: {self.cursor}\n\n", body)
+        self.assertIn("event: orders\n", body)
+        self.assertIn(f'"id": {self.new.id}', body)
+
+    def test_wsgi_requests_get_an_immediate_poll_instead_of_a_stream(self):
+        with patch('food.feed.ORDER_FEED_INTERVAL', 0), patch('food.views.wait_for_changes',
+                                                              wraps=wait_for_changes) as wait:
+            response = self.client.get(reverse('food:order_feed'), {'cursor': self.cursor, 'timeout': 30},
+                                       HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(wait.call_args.args[1], 0)
+        self.assertEqual(len(response.json()['orders']), 2)
+
+        dashboard = self.client.get(reverse('food:admin_dashboard'))
+        self.assertFalse(dashboard.context['order_feed_sse'])
+        self.assertNotContains(dashboard, 'new EventSource')
+
+    def test_idle_feeds_share_one_change_check(self):
+        _, cursor = fetch_changes(decode_cursor(self.cursor))
+
+        async def five_feeds():
+            return await asyncio.gather(*[wait_for_changes(cursor, 0.05) for _ in range(5)])
+
+        with patch('food.feed.ORDER_FEED_INTERVAL', 60), patch.object(feed, 'notifier', ChangeNotifier()), \
+                patch('food.feed.fetch_changes', wraps=fetch_changes) as fetch:
+            with CaptureQueriesContext(connection) as queries:
+                results = async_to_sync(five_feeds)()
+        self.assertEqual([rows for rows, _ in results], [[]] * 5)
+        # one catch-up fetch per feed, then only the shared check
+        self.assertEqual(fetch.call_count, 5)
+        self.assertEqual(sum('MAX(' in query['sql'] for query in queries), 1)
+
+    def test_requires_an_admin(self):
+        self.client.force_login(CustomUser.objects.create_user('guest', 'guest@example.com', 'secret'))
+        self.assertEqual(self.client.get(reverse('food:order_feed'), {'timeout': 0}).status_code, 403)
+
+
+class DailySalesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'secret', user_type='admin')
+        cls.diner = CustomUser.objects.create_user('diner', 'diner@example.com', 'secret')
+        cls.dal = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        cls.lassi = FoodItem.objects.create(name='Lassi', category='drinks', price=4, image='food_images/x.jpg')
+        cls.photo = Gallery.objects.create(caption='Thali', price=25, image='gallery/x.jpg')
+
+    def rollup(self):
+        return set(DailySales.objects.values_list('day', 'item_type', 'item_id', 'category', 'quantity', 'revenue'))
+
+    def test_rebuild_matches_paid_and_admin_completed_orders(self):
+        Order.objects.create(user=self.diner, item=self.dal, quantity=2)
+        Order.objects.create(user=self.diner, item=self.lassi, quantity=1)
+        Order.objects.create(user=self.diner, gallery_item=self.photo, quantity=1)
+        settle_cart(self.diner, first_name='D', payment_method='upi')
+
+        Order.objects.create(user=self.diner, item=self.dal, quantity=1)
+        settle_cart(self.diner, first_name='D', payment_method='upi')
+
+        self.client.force_login(self.admin)
+        walk_in = Order.objects.create(user=self.admin, item=self.dal, quantity=3)
+        self.client.post(reverse('food:mark_done', args=[walk_in.id]))
+        # completing it again counts nothing twice
+        self.client.post(reverse('food:mark_done', args=[walk_in.id]))
+        batch = [Order.objects.create(user=self.admin, item=self.lassi),
+                 Order.objects.create(user=self.admin, gallery_item=self.photo, quantity=2)]
+        self.client.post(reverse('food:complete_orders'), {'ids': [order.id for order in batch]})
+        Order.objects.create(user=self.diner, item=self.lassi)  # still pending, in neither
+
+        incremental = self.rollup()
+        today = timezone.localdate()
+        self.assertEqual(DailySales.objects.get(day=today, item_type='food', item_id=self.dal.id).quantity, 6)
+        self.assertEqual(rebuild_daily_sales(), 3)
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_large_batches_lock_the_rollup_in_bounded_queries(self):
+        FoodItem.objects.bulk_create([
+            FoodItem(name=f'Dish {n}', category='veg', price=2, image='food_images/x.jpg') for n in range(450)
+        ])
+        dishes = list(FoodItem.objects.filter(name__startswith='Dish ').order_by('id'))
+
+        def record_sales_for(quantity):
+            Order.objects.bulk_create([Order(user=self.admin, item=dish, quantity=quantity) for dish in dishes])
+            record_sales(Order.objects.filter(user=self.admin, quantity=quantity))
+
+        record_sales_for(1)
+        # a third of the items already have a row for today
+        DailySales.objects.filter(item_id__in=[dish.id for dish in dishes[150:]]).delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            record_sales_for(2)
+        reads = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'food_dailysales' in q['sql']]
+        self.assertEqual(len(reads), 3)
+        self.assertFalse(any(' OR ' in sql for sql in reads))
+        self.assertEqual(
+            sorted(DailySales.objects.values_list('quantity', flat=True)), [2] * 300 + [3] * 150,
+        )
+
+
+PAYMENT_FORM = {
+    'first_name': 'Dee', 'last_name': 'Ner', 'address': '1 Main Road', 'country': 'India',
+    'state': 'Tamil Nadu', 'pin_code': '600001', 'payment_method': 'upi',
+}
+
+
+class SettleCartTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.diner = CustomUser.objects.create_user('diner', 'diner@example.com', 'secret')
+        cls.dal = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+
+    def test_double_submit_pays_once(self):
+        Order.objects.create(user=self.diner, item=self.dal, quantity=2)
+        self.client.force_login(self.diner)
+        first = self.client.post(reverse('food:payment'), PAYMENT_FORM)
+        second = self.client.post(reverse('food:payment'), PAYMENT_FORM)
+        self.assertRedirects(first, reverse('food:order_success'), fetch_redirect_response=False)
+        self.assertRedirects(second, reverse('food:main'), fetch_redirect_response=False)
+        self.assertEqual(list(Payments.objects.values_list('user', 'amount')), [(self.diner.id, 20)])
+        self.assertEqual(DailySales.objects.get().quantity, 2)
+
+    def test_locks_the_pending_order_rows(self):
+        Order.objects.create(user=self.diner, item=self.dal)
+        with patch.object(QuerySet, 'select_for_update', autospec=True,
+                          side_effect=QuerySet.select_for_update) as lock:
+            settle_cart(self.diner, **PAYMENT_FORM)
+        queryset, = lock.call_args_list[0].args
+        self.assertEqual(queryset.model, Order)
+        self.assertEqual(lock.call_args_list[0].kwargs, {'of': ('self',)})
+
+    @skipUnlessDBFeature('has_select_for_update_of')
+    def test_lock_is_in_the_sql(self):
+        Order.objects.create(user=self.diner, item=self.dal)
+        with CaptureQueriesContext(connection) as queries:
+            settle_cart(self.diner, **PAYMENT_FORM)
+        self.assertTrue(any('FOR UPDATE OF' in query['sql'] for query in queries))
+
+    def test_settlement_runs_the_same_queries_for_any_cart_size(self):
+        items = [FoodItem.objects.create(name=f"Dish {n}", category='veg', price=5, image='food_images/x.jpg')
+                 for n in range(13)]
+
+        def settle(cart):
+            for item in cart:
+                Order.objects.create(user=self.diner, item=item)
+            with CaptureQueriesContext(connection) as queries:
+                settle_cart(self.diner, **PAYMENT_FORM)
+            return len(queries)
+
+        # rollup rows inserted, then the same rows updated
+        self.assertEqual(settle(items[:1]), settle(items[1:]))
+        self.assertEqual(settle(items[:1]), settle(items[1:]))
+        self.assertEqual(DailySales.objects.get(item_id=items[0].id).quantity, 2)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentSettleCartTests(TransactionTestCase):
+    """Two submits racing in separate connections: the second waits on the row locks."""
+
+    def test_concurrent_submits_pay_once(self):
+        diner = CustomUser.objects.create_user('racer', 'racer@example.com', 'secret')
+        dal = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        Order.objects.create(user=diner, item=dal, quantity=3)
+        barrier = threading.Barrier(2)
+        payments = []
+
+        def submit():
+            try:
+                barrier.wait()
+                payments.append(settle_cart(diner, **PAYMENT_FORM))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(payment is not None for payment in payments), 1)
+        self.assertEqual(Payments.objects.count(), 1)
+        self.assertEqual(DailySales.objects.get().quantity, 3)
+
+
+class SalesReportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Monday 2 June 2025 to Sunday 15 June 2025, two whole weeks in the past
+        self.start = date(2025, 6, 2)
+        self.end = date(2025, 6, 15)
+        for day, item_id, category, quantity, revenue in [
+            (date(2025, 6, 2), 1, 'veg', 2, 20),
+            (date(2025, 6, 4), 2, 'drinks', 1, 5),
+            (date(2025, 6, 10), 1, 'veg', 1, 10),
+            (date(2025, 6, 11), 3, '', 1, 50),
+        ]:
+            DailySales.objects.create(day=day, item_type='gallery' if not category else 'food',
+                                      item_id=item_id, category=category, quantity=quantity, revenue=revenue)
+
+    def test_groups_by_period_and_category_and_caches_closed_periods(self):
+        report = sales_report(self.start, self.end, 'week')
+        self.assertEqual(report, [
+            (date(2025, 6, 2), {'veg': (2, 20), 'drinks': (1, 5)}),
+            (date(2025, 6, 9), {'veg': (1, 10), 'gallery': (1, 50)}),
+        ])
+        with self.assertNumQueries(0):
+            self.assertEqual(sales_report(self.start, self.end, 'week'), report)
+        # partial periods at the edges are not cached
+        with self.assertNumQueries(1):
+            self.assertEqual(sales_report(date(2025, 6, 3), self.end, 'week')[0][1], {'drinks': (1, 5)})
+
+    def test_late_settlement_refreshes_the_cached_period(self):
+        june = (date(2025, 6, 1), date(2025, 6, 30))
+        sales_report(*june, 'month')
+        with self.assertNumQueries(0):
+            sales_report(*june, 'month')
+        user = CustomUser.objects.create_user('late', 'late@example.com', 'secret')
+        dish = FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        order = Order.objects.create(user=user, item=dish, quantity=3)
+        Order.objects.filter(pk=order.pk).update(ordered_at=timezone.make_aware(datetime(2025, 6, 20, 12)))
+        with self.captureOnCommitCallbacks(execute=True):
+            record_sales(Order.objects.filter(pk=order.pk))
+        self.assertEqual(sales_report(*june, 'month'),
+                         [(date(2025, 6, 1), {'veg': (6, 60), 'drinks': (1, 5), 'gallery': (1, 50)})])
+
+    def test_periods_at_the_end_of_the_calendar(self):
+        self.assertEqual(sales_report(date(9999, 12, 1), date.max, 'month'), [(date(9999, 12, 1), {})])
+        self.assertEqual(sales_report(date(9999, 12, 20), date.max, 'week'),
+                         [(date(9999, 12, 20), {}), (date(9999, 12, 27), {})])
+        self.assertEqual(sales_report(date.max, date.max, 'day'), [(date.max, {})])
+
+    def test_page_rejects_bad_and_oversized_ranges(self):
+        admin = CustomUser.objects.create_user('boss', 'boss@example.com', 'secret', user_type='admin')
+        self.client.force_login(admin)
+        url = reverse('food:sales_report')
+        response = self.client.get(url, {'start': '9999-12-01', 'end': '9999-12-31', 'granularity': 'month'})
+        self.assertEqual(response.status_code, 200)
+        for params in [
+            {'start': '0001-01-01', 'end': '9999-12-31', 'granularity': 'day'},
+            {'start': '2000-01-01', 'end': '2050-01-01', 'granularity': 'month'},
+            {'end': '0001-01-05'},
+            {'start': '2025-06-15', 'end': '2025-06-01'},
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        with self.assertRaises(ValueError):
+            sales_report(date(2000, 1, 1), date(2025, 1, 1), 'day')
+
+
+def image_upload(name, color='red', fmt='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), color).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ImageDerivativeTests(TestCase):
+    """Every upload gets its own resized copies, which go away with it."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.admin = CustomUser.objects.create_user('chef', 'chef@example.com', 'secret', user_type='admin')
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_same_stem_with_another_extension_gets_its_own_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jpg = FoodItem.objects.create(name='Pizza', category='veg', price=5, image=image_upload('pizza.jpg'))
+            png = FoodItem.objects.create(name='Pizza', category='veg', price=5,
+                                          image=image_upload('pizza.png', color='blue', fmt='PNG'))
+        wait_for_builds()
+        jpg_thumb, png_thumb = (derivative_name(item.image.name, 120, 'jpg') for item in (jpg, png))
+        self.assertNotEqual(jpg_thumb, png_thumb)
+        with Image.open(os.path.join(self.media_root, png_thumb)) as thumb:
+            self.assertGreater(thumb.getpixel((0, 0))[2], 200)
+
+    def test_derivatives_are_built_after_the_commit_off_the_request(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            dish = FoodItem.objects.create(name='Dal', category='veg', price=5, image=image_upload('dal.jpg'))
+        self.assertFalse(any(self.exists(name) for name in derivative_names(dish.image.name)))
+        threads = []
+
+        def build(storage, name):
+            threads.append(threading.current_thread().name)
+            return build_field_derivatives(storage, name)
+
+        with patch('food.images.build_field_derivatives', side_effect=build):
+            for callback in callbacks:
+                callback()
+            wait_for_builds()
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('image-derivatives'), threads)
+        self.assertTrue(all(self.exists(name) for name in derivative_names(dish.image.name)))
+
+    def test_replaced_and_deleted_images_lose_their_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            dish = FoodItem.objects.create(name='Dal', category='veg', price=5, image=image_upload('dal.jpg'))
+        wait_for_builds()
+        old = derivative_names(dish.image.name)
+        self.assertTrue(all(self.exists(name) for name in old))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dish.image = image_upload('dal-new.jpg')
+            dish.save()
+        wait_for_builds()
+        self.assertFalse(any(self.exists(name) for name in old))
+        new = derivative_names(dish.image.name)
+        self.assertTrue(all(self.exists(name) for name in new))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dish.delete()
+        self.assertFalse(any(self.exists(name) for name in new))
+
+    def test_rendering_remembers_built_derivatives(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            dish = FoodItem.objects.create(name='Dal', category='veg', price=5, image=image_upload('dal.jpg'))
+        template = Template('{% load image_tags %}{% responsive_image image %}')
+        with patch.object(dish.image.storage, 'exists', return_value=False):
+            self.assertNotIn('<picture>', template.render(Context({'image': dish.image})))
+        # not built yet is never remembered
+        wait_for_builds()
+        with patch.object(dish.image.storage, 'exists', wraps=dish.image.storage.exists) as exists:
+            for _ in range(3):
+                self.assertIn('<picture>', template.render(Context({'image': dish.image})))
+        self.assertEqual(exists.call_count, 1)
+
+    def test_non_image_upload_is_rejected(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('food:add_gallery'), {
+            'image': SimpleUploadedFile('notes.jpg', b'not an image'), 'caption': 'Notes', 'price': '5',
+        })
+        self.assertRedirects(response, reverse('food:add_gallery'), fetch_redirect_response=False)
+        self.assertFalse(Gallery.objects.exists())
+
+    def test_unreadable_image_is_logged_not_raised(self):
+        with self.assertLogs('food.images', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                photo = Gallery.objects.create(caption='Notes', image=SimpleUploadedFile('notes.jpg', b'not an image'))
+            wait_for_builds()
+        self.assertTrue(Gallery.objects.filter(pk=photo.pk).exists())
+
+    def test_backfill_skips_corrupt_files_and_keeps_going(self):
+        folder = os.path.join(self.media_root, 'food_images')
+        os.makedirs(folder)
+        with open(os.path.join(folder, 'a-notes.jpg'), 'wb') as handle:
+            handle.write(b'not an image')
+        # over twice Image.MAX_IMAGE_PIXELS: DecompressionBombError, not an OSError
+        Image.new('1', (15000, 12000)).save(os.path.join(folder, 'b-bomb.png'))
+        Image.new('RGB', (400, 300), 'red').save(os.path.join(folder, 'c-dish.jpg'))
+        out, err = io.StringIO(), io.StringIO()
+        call_command('build_image_derivatives', workers=1, stdout=out, stderr=err)
+        self.assertIn('Skipped food_images/a-notes.jpg', err.getvalue())
+        self.assertIn('Skipped food_images/b-bomb.png', err.getvalue())
+        self.assertIn('(6 files written, 2 failed)', out.getvalue())
+        self.assertTrue(all(self.exists(name) for name in derivative_names('food_images/c-dish.jpg')))
+
+
+class MediaServingTests(TestCase):
+    """Uploads are served with caching headers, conditional requests and byte ranges."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'gallery'))
+        with open(os.path.join(self.media_root, 'gallery', 'dish.jpg'), 'wb') as handle:
+            handle.write(bytes(range(100)))
+        with open(os.path.join(self.media_root, 'secret.txt'), 'w') as handle:
+            handle.write('not public')
+        override = self.settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_full_file_then_not_modified(self):
+        response = self.client.get('/media/gallery/dish.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        response = self.client.get('/media/gallery/dish.jpg', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get('/media/gallery/dish.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.client.get('/media/gallery/dish.jpg', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+
+        response = self.client.get('/media/gallery/dish.jpg', HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_only_upload_folders_are_public(self):
+        self.assertEqual(self.client.get('/media/secret.txt').status_code, 404)
+        self.assertEqual(self.client.get('/media/gallery/../secret.txt').status_code, 404)
+
+    def test_sendfile_leaves_the_bytes_to_the_front_server(self):
+        with patch.object(media, 'MEDIA_SENDFILE', 'x-accel-redirect'):
+            response = self.client.get('/media/gallery/dish.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/gallery/dish.jpg')
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class PrimaryReplicaRouterTests(TestCase):
+    """Request reads go to a replica unless the client has to read its own writes."""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        # TestCase wraps every test in a transaction, pretend there is none
+        outside_transaction = patch.object(connection, 'in_atomic_block', False)
+        outside_transaction.start()
+        self.addCleanup(outside_transaction.stop)
+
+    def in_request(self, pinned=False):
+        state, token = begin_request(pinned)
+        self.addCleanup(end_request, token)
+        return state
+
+    def test_reads_outside_requests_stay_on_primary(self):
+        self.assertEqual(self.router.db_for_read(FoodItem), DEFAULT_DB_ALIAS)
+
+    def test_request_reads_go_to_replica_until_the_request_writes(self):
+        self.in_request()
+        self.assertEqual(self.router.db_for_read(FoodItem), 'replica1')
+        self.router.db_for_write(Order)
+        self.assertEqual(self.router.db_for_read(FoodItem), DEFAULT_DB_ALIAS)
+
+    def test_pinned_clients_read_from_primary(self):
+        self.in_request(pinned=True)
+        self.assertEqual(self.router.db_for_read(FoodItem), DEFAULT_DB_ALIAS)
+
+    def test_reads_inside_transactions_stay_on_primary(self):
+        self.in_request()
+        with patch.object(connection, 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(FoodItem), DEFAULT_DB_ALIAS)
+
+    def test_middleware_pins_the_client_after_a_write(self):
+        def write(request):
+            PrimaryReplicaRouter().db_for_write(Order)
+            return HttpResponse()
+
+        factory = RequestFactory()
+        self.assertNotIn(PIN_COOKIE, ReplicaPinningMiddleware(lambda request: HttpResponse())(factory.get('/')).cookies)
+        self.assertIn(PIN_COOKIE, ReplicaPinningMiddleware(write)(factory.post('/')).cookies)
+
+    def test_middleware_pins_async_requests_too(self):
+        async def write(request):
+            await sync_to_async(PrimaryReplicaRouter().db_for_write)(Order)
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(write)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().post('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_catalog_refills_and_etags_read_the_primary(self):
+        with patch.object(connection, 'in_atomic_block', True):
+            FoodItem.objects.create(name='Dal', category='veg', price=10, image='food_images/x.jpg')
+        cache.clear()
+        self.in_request()
+        with patch.object(db_router.routers[0], 'replicas', ['replica1']):
+            # there is no replica1 connection, any read routed to it would fail
+            with self.assertRaises(ConnectionDoesNotExist):
+                list(FoodItem.objects.all())
+            self.assertEqual([item.name for item in get_menu_items()], ['Dal'])
+            self.assertEqual(get_gallery_images(), [])
+            catalog_etag('menu', RequestFactory().get('/api/menu/'))
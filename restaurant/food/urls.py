@@ -19,12 +19,16 @@ urlpatterns = [
     path('edit_food/<int:food_id>/', views.edit_food, name='edit_food'),
     path('delete_food/<int:food_id>/', views.delete_food, name='delete_food'),
     path('mark_gallery_done/<int:order_id>/', views.mark_gallery_done, name='mark_gallery_done'),
+    path('export/<str:kind>/', views.export_data, name='export_data'),
 
 
     # ---------------------- ORDERS ----------------------
     path('order/<int:item_id>/', views.order_page, name='order_page'),
     path('mark_done/<int:order_id>/', views.mark_done, name='mark_done'),
     path('order/mark_completed/<int:order_id>/', views.mark_order_completed, name='mark_order_completed'),
+    path('orders/complete/', views.complete_orders, name='complete_orders'),
+    path('orders/feed/', views.order_feed, name='order_feed'),
+    path('reports/sales/', views.sales_report_page, name='sales_report'),
 
     # ---------------------- GALLERY ----------------------
     path('add_gallery/', views.add_gallery, name='add_gallery'),
@@ -36,5 +40,11 @@ urlpatterns = [
     path('payment/', views.payment, name='payment'),
     path('order_success/',views.order_sucess,name='order_success'),
 
-    path('feedback/',views.feedback,name='feedback')
+    path('feedback/',views.feedback,name='feedback'),
+
+    # ---------------------- CATALOG API ----------------------
+    path('api/menu/', views.api_menu, name='api_menu'),
+    path('api/gallery/', views.api_gallery, name='api_gallery'),
+    path('api/search/', views.api_search, name='api_search'),
+    path('api/ratings/', views.api_ratings, name='api_ratings'),
 ]
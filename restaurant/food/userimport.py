@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import CustomUser
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if extension in ('jsonl', 'ndjson') else extension
+
+
+def read_records(path, format=None):
+    """Yield one dict per user from a CSV file with a header row or a JSON lines file."""
+    format = format or detect_format(path)
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format {format!r}, use one of {', '.join(IMPORT_FORMATS)}.")
+    with open(path, newline='', encoding='utf-8') as handle:
+        if format == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _init_worker():
+    # spawned workers (macOS, Windows) start without configured settings
+    django.setup()
+
+
+def _clean(record):
+    """Return (username, email, password, user_type) or raise ValidationError.
+
+    Runs the model field validators, max_length included, so a bad row is
+    reported here rather than failing the bulk insert of its whole batch.
+    """
+    username = _validate('username', (record.get('username') or '').strip(), CustomUser.username_validator)
+    email = _validate('email', BaseUserManager.normalize_email((record.get('email') or '').strip()))
+    user_type = _validate('user_type', (record.get('user_type') or 'user').strip())
+    password = record.get('password') or None
+    if password is not None and not isinstance(password, str):
+        raise ValidationError("password must be a string")
+    return username, email, password, user_type
+
+
+def _validate(name, value, *validators):
+    try:
+        value = CustomUser._meta.get_field(name).clean(value, None)
+        for validator in validators:
+            validator(value)
+        return value
+    except ValidationError as exc:
+        raise ValidationError(f"{name}: {' '.join(exc.messages)}") from None
+
+
+def _email_key(email):
+    # addresses differing only in case are one mailbox, and one account
+    return email.lower()
+
+
+def _taken(usernames, emails):
+    # LOWER(email) IN (...) is answered from customuser_email_lower_idx
+    return CustomUser.objects.annotate(email_key=Lower('email')).filter(
+        Q(username__in=usernames) | Q(email_key__in=[_email_key(email) for email in emails])
+    )
+
+
+def _existing(usernames, emails):
+    """Usernames and lower cased emails already taken, in one query for the whole batch."""
+    existing_usernames, existing_emails = set(), set()
+    for username, email_key in _taken(usernames, emails).values_list('username', 'email_key'):
+        existing_usernames.add(username)
+        existing_emails.add(email_key)
+    return existing_usernames, existing_emails
+
+
+def import_users(records, batch_size=1000, workers=None, stdout=None, stderr=None):
+    """Create users from ``records`` in batches and return the counts.
+
+    Each batch is validated and de-duplicated in memory, checked against
+    existing accounts with a single query, has its passwords hashed across a
+    process pool and is written with one bulk_create. Emails are compared
+    ignoring case. Rows without a password get an unusable one. Conflicting
+    rows, and rows the CustomUser field validators reject, are skipped and
+    reported.
+    """
+    counts = {'imported': 0, 'conflicts': 0, 'invalid': 0}
+    records = iter(records)
+    row_number = 0
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers != 1 else None
+
+    def skip(kind, number, reason):
+        counts[kind] += 1
+        if stderr is not None:
+            stderr.write(f"Skipped row {number}: {reason}")
+
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+
+            rows, seen_usernames, seen_emails = [], set(), set()
+            for record in batch:
+                row_number += 1
+                try:
+                    username, email, password, user_type = _clean(record)
+                except AttributeError as exc:
+                    skip('invalid', row_number, exc)
+                    continue
+                except ValidationError as exc:
+                    skip('invalid', row_number, '; '.join(exc.messages))
+                    continue
+                if username in seen_usernames or _email_key(email) in seen_emails:
+                    skip('conflicts', row_number, f"{username} / {email} repeats an earlier row")
+                    continue
+                seen_usernames.add(username)
+                seen_emails.add(_email_key(email))
+                rows.append((row_number, username, email, password, user_type))
+
+            existing_usernames, existing_emails = _existing(
+                [row[1] for row in rows], [row[2] for row in rows],
+            )
+            fresh = []
+            for number, username, email, password, user_type in rows:
+                if username in existing_usernames or _email_key(email) in existing_emails:
+                    skip('conflicts', number, f"{username} / {email} already exists")
+                else:
+                    fresh.append((username, email, password, user_type))
+
+            passwords = [row[2] for row in fresh]
+            if pool is not None:
+                hashes = list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 64)))
+            else:
+                hashes = [make_password(password) for password in passwords]
+
+            CustomUser.objects.bulk_create([
+                CustomUser(username=username, email=email, password=password_hash, user_type=user_type)
+                for (username, email, _, user_type), password_hash in zip(fresh, hashes)
+            ])
+            counts['imported'] += len(fresh)
+
+            if stdout is not None:
+                elapsed = time.perf_counter() - started
+                stdout.write(
+                    f"  {row_number} rows read, {counts['imported']} imported, "
+                    f"{counts['conflicts']} conflicts, {counts['invalid']} invalid "
+                    f"({counts['imported'] / elapsed:.0f} users/s)"
+                )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return counts
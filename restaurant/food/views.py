@@ -1,19 +1,46 @@
+from django import forms
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import FoodItemForm, LoginForm, RegisterForm
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
-from .models import ContactMessage, FeedBack, FoodItem, Gallery, Order, GalleryOrder, Payments
+from .models import ContactMessage, FeedBack, FoodItem, Gallery, Order, Payments
 from django.contrib.auth.decorators import login_required
 from decimal import Decimal, InvalidOperation
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .analytics import GRANULARITIES, SALES_REPORT_MAX_PERIODS, period_count, sales_report
+from .buffers import contact_buffer, feedback_buffer
+from .cart import get_cart, settle_cart
+from .exports import EXPORT_FORMATS, EXPORTS, STREAMERS, export_rows, parse_export_date
+from .feed import (
+    ORDER_FEED_POLL_DELAY, ORDER_FEED_TIMEOUT, ORDER_FEED_WSGI_TIMEOUT, current_cursor, decode_cursor,
+    encode_cursor, is_asgi, order_events, serialize_order, wait_for_changes,
+)
+from .catalog import (
+    catalog_etag, catalog_last_modified, get_gallery_images, get_menu_items,
+    serialize_food_item, serialize_gallery_image,
+)
+from .pagination import cursor_slice, keyset_paginate
+from .ratelimit import clear_login_attempts, login_allowed, rejected_login_counts
+from .ratings import rating_summary
+from .sales import complete_pending_orders
+from .search import search_menu
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from asgiref.sync import sync_to_async
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST, require_safe
 
 
 
 # ---------------------- MAIN PAGE ----------------------
 def main_page(request):
-    food_items = FoodItem.objects.all()
-    gallery_images = Gallery.objects.all()
+    food_items = get_menu_items()
+    gallery_images = get_gallery_images()
     return render(request, 'food/main.html', {
         'food_items': food_items,
         'gallery_images': gallery_images,
@@ -32,6 +59,11 @@ def login_page(request):
             return render(request, 'food/login.html', {'form': form})
 
         if form.is_valid():
+            # checked before authenticate() so rejected attempts never pay for a password hash
+            if not login_allowed(request, form.cleaned_data['username']):
+                messages.error(request, "Too many login attempts. Please wait a few minutes and try again.")
+                return render(request, 'food/login.html', {'form': form}, status=429)
+
             user = authenticate(
                 request,
                 username=form.cleaned_data['username'],
@@ -44,6 +76,7 @@ def login_page(request):
                     return redirect('food:login')
 
                 login(request, user)
+                clear_login_attempts(request, form.cleaned_data['username'])
 
                 if role == "admin":
                     return redirect('food:admin_dashboard')
@@ -77,25 +110,26 @@ def admin_dashboard(request):
         messages.error(request, "Access Denied!")
         return redirect('food:main')
 
-    food_items = FoodItem.objects.all()
-    orders = Order.objects.all().select_related('item', 'user')
-    gallery_orders = GalleryOrder.objects.all().select_related('gallery_item', 'user')
-    contact_messages = ContactMessage.objects.all()
-    gallery_images = Gallery.objects.all()
-    payments = Payments.objects.all()
-    feedbacks = FeedBack.objects.all()
-
+    food_items = keyset_paginate(request, FoodItem.objects.all(), 'food_page')
+    orders = keyset_paginate(request, Order.objects.filter(item__isnull=False).select_related('item', 'user'), 'orders_page')
+    gallery_orders = keyset_paginate(request, Order.objects.filter(gallery_item__isnull=False).select_related('gallery_item', 'user'), 'gallery_orders_page')
+    contact_messages = keyset_paginate(request, ContactMessage.objects.all(), 'messages_page')
+    gallery_images = keyset_paginate(request, Gallery.objects.all(), 'gallery_page')
+    payments = keyset_paginate(request, Payments.objects.select_related('user'), 'payments_page')
+    feedbacks = keyset_paginate(request, FeedBack.objects.select_related('user'), 'feedbacks_page')
 
     User = get_user_model()
     total_users = User.objects.count()
-    total_food_orders = orders.count()
-    total_gallery_orders = gallery_orders.count()
 
-    total_revenue = 0
-    for o in orders:
-        total_revenue += o.item.price * o.quantity
-    for g in gallery_orders:
-        total_revenue += g.gallery_item.price * g.quantity
+    # one aggregate query over all order lines instead of looping over every row
+    totals = Order.objects.aggregate(
+        food_orders=Count('id', filter=Q(item__isnull=False)),
+        gallery_orders=Count('id', filter=Q(gallery_item__isnull=False)),
+        revenue=Sum(Order.line_total_expression()),
+    )
+    total_food_orders = totals['food_orders']
+    total_gallery_orders = totals['gallery_orders']
+    total_revenue = totals['revenue'] or 0
 
     return render(request, 'food/admin_dashboard.html', {
         'food_items': food_items,
@@ -108,7 +142,13 @@ def admin_dashboard(request):
         'total_gallery_orders': total_gallery_orders,
         'total_revenue': total_revenue,
         'payments':payments,
-        'feedbacks':feedbacks
+        'feedbacks':feedbacks,
+        'rejected_logins': rejected_login_counts(),
+        'ratings': rating_summary(),
+        'order_feed_cursor': encode_cursor(current_cursor()),
+        # SSE only where a stream does not tie up a worker
+        'order_feed_sse': is_asgi(request),
+        'order_feed_poll_delay': ORDER_FEED_POLL_DELAY,
     })
 
 
@@ -118,9 +158,8 @@ def mark_gallery_done(request, order_id):
         messages.error(request, "Access Denied!")
         return redirect('food:main')
 
-    order = get_object_or_404(GalleryOrder, id=order_id)
-    order.status = 'Completed'
-    order.save()
+    order = get_object_or_404(Order, id=order_id, gallery_item__isnull=False)
+    complete_pending_orders(Order.objects.filter(id=order.id))
     messages.success(request, f"Gallery Order #{order.id} marked as completed.")
     return redirect('food:admin_dashboard')
 
@@ -192,7 +231,9 @@ def order_page(request, item_id):
         # redirect to checkout so user can confirm and pay
         return redirect('food:checkout')
 
-    return render(request, 'food/order_page.html', {'item': item})
+    # precomputed by build_recommendations, one read of the (item, rank) index
+    recommendations = item.recommendations.select_related('recommended').order_by('rank')
+    return render(request, 'food/order_page.html', {'item': item, 'recommendations': recommendations})
 
 
 @login_required(login_url='food:login')
@@ -203,8 +244,7 @@ def mark_order_completed(request, order_id):
         return redirect('food:main')
 
     order = get_object_or_404(Order, id=order_id)
-    order.status = 'Completed'
-    order.save()
+    complete_pending_orders(Order.objects.filter(id=order.id))
     messages.success(request, f"Order #{order.id} marked as completed!")
     return redirect('food:admin_dashboard')
 
@@ -216,25 +256,192 @@ def mark_done(request, order_id):
         return redirect('food:main')
 
     order = get_object_or_404(Order, id=order_id)
-    order.status = 'Completed'
-    order.save()
+    complete_pending_orders(Order.objects.filter(id=order.id))
     messages.success(request, f"Order #{order.id} marked as completed.")
     return redirect('food:admin_dashboard')
 
 
+@require_POST
+def complete_orders(request):
+    """Complete many pending orders with one UPDATE and answer with the ids for in-place updates.
+
+    Takes either repeated ``ids`` or ``before`` (an ISO timestamp, every
+    pending order placed earlier), optionally narrowed by ``kind``. Errors,
+    a missing login included, are answered in JSON rather than redirected.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': "Log in first."}, status=401)
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': "Access Denied!"}, status=403)
+
+    pending = Order.objects.filter(status='Pending')
+    kind = request.POST.get('kind') or 'all'
+    if kind == 'food':
+        pending = pending.filter(item__isnull=False)
+    elif kind == 'gallery':
+        pending = pending.filter(gallery_item__isnull=False)
+    elif kind != 'all':
+        return JsonResponse({'error': "kind must be food, gallery or all."}, status=400)
+
+    ids = request.POST.getlist('ids')
+    before = request.POST.get('before')
+    if ids:
+        try:
+            pending = pending.filter(id__in=[int(order_id) for order_id in ids])
+        except ValueError:
+            return JsonResponse({'error': "ids must be integers."}, status=400)
+    elif before:
+        try:
+            before = parse_datetime(before)
+        except ValueError:
+            before = None
+        if before is None:
+            return JsonResponse({'error': "before must be an ISO 8601 timestamp."}, status=400)
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before)
+        pending = pending.filter(ordered_at__lt=before)
+    else:
+        return JsonResponse({'error': "Pass ids or before."}, status=400)
+
+    # the matching rows are locked, so the ids we report are exactly the ones updated
+    completed_ids = complete_pending_orders(pending)
+    return JsonResponse({'completed': len(completed_ids), 'ids': completed_ids})
+
+
+# ---------------------- KITCHEN ORDER FEED ----------------------
+@login_required(login_url='food:login')
+async def order_feed(request):
+    """Orders created or changed after a cursor, for the kitchen screen.
+
+    Under ASGI, browsers asking for ``text/event-stream`` get Server-Sent
+    Events. Everything else is answered as a long-poll with the rows and the
+    next cursor, waiting at most ``timeout`` seconds for something to change;
+    under WSGI, where a waiting request holds a worker, at most
+    ORDER_FEED_WSGI_TIMEOUT seconds.
+    """
+    user = await request.auser()
+    if user.user_type != 'admin':
+        return JsonResponse({'error': "Access Denied!"}, status=403)
+
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor')
+    try:
+        cursor = decode_cursor(cursor) if cursor else current_cursor()
+        max_timeout = ORDER_FEED_TIMEOUT if is_asgi(request) else ORDER_FEED_WSGI_TIMEOUT
+        timeout = min(max(float(request.GET.get('timeout', max_timeout)), 0), max_timeout)
+    except (OverflowError, ValueError):
+        return JsonResponse({'error': "cursor and timeout are not valid."}, status=400)
+
+    if is_asgi(request) and 'text/event-stream' in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(order_events(cursor), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx would otherwise buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    orders, cursor = await wait_for_changes(cursor, timeout)
+    return JsonResponse({
+        'orders': [serialize_order(order) for order in orders],
+        'cursor': encode_cursor(cursor),
+    })
+
+
+
+# ---------------------- EXPORTS ----------------------
+@login_required(login_url='food:login')
+def export_data(request, kind):
+    if request.user.user_type != 'admin':
+        messages.error(request, "Access Denied!")
+        return redirect('food:main')
+
+    if kind not in EXPORTS:
+        raise Http404("Unknown export.")
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson.")
+    try:
+        start = parse_export_date(request.GET.get('start'))
+        end = parse_export_date(request.GET.get('end'))
+    except ValueError:
+        return HttpResponseBadRequest("start and end must be dates like 2025-01-31.")
+
+    rows = export_rows(kind, start, end)
+    response = StreamingHttpResponse(STREAMERS[export_format](kind, rows), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{export_format}"'
+    return response
+
+
+# ---------------------- SALES REPORT ----------------------
+SALES_REPORT_DEFAULT_DAYS = 30
+
+
+@login_required(login_url='food:login')
+def sales_report_page(request):
+    if request.user.user_type != 'admin':
+        messages.error(request, "Access Denied!")
+        return redirect('food:main')
+
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return HttpResponseBadRequest("granularity must be day, week or month.")
+    try:
+        end = parse_export_date(request.GET.get('end')) or timezone.localdate()
+        start = parse_export_date(request.GET.get('start')) or end - timedelta(days=SALES_REPORT_DEFAULT_DAYS - 1)
+    except (ValueError, OverflowError):
+        return HttpResponseBadRequest("start and end must be dates like 2025-01-31.")
+    if start > end:
+        return HttpResponseBadRequest("start must not be after end.")
+    if period_count(start, end, granularity) > SALES_REPORT_MAX_PERIODS:
+        return HttpResponseBadRequest(f"Pick a shorter range, at most {SALES_REPORT_MAX_PERIODS} {granularity}s.")
+
+    report = sales_report(start, end, granularity)
+    categories = sorted({category for _, totals in report for category in totals})
+    rows = []
+    category_totals = {category: [0, Decimal(0)] for category in categories}
+    for period, totals in report:
+        cells = [totals.get(category, (0, Decimal(0))) for category in categories]
+        for category, (quantity, revenue) in totals.items():
+            category_totals[category][0] += quantity
+            category_totals[category][1] += revenue
+        rows.append({
+            'period': period,
+            'cells': cells,
+            'quantity': sum(quantity for quantity, _ in cells),
+            'revenue': sum((revenue for _, revenue in cells), Decimal(0)),
+        })
+
+    return render(request, 'food/sales_report.html', {
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'granularities': list(GRANULARITIES),
+        'categories': categories,
+        'rows': rows,
+        'category_totals': [category_totals[category] for category in categories],
+        'total_quantity': sum(row['quantity'] for row in rows),
+        'total_revenue': sum((row['revenue'] for row in rows), Decimal(0)),
+    })
+
 
 # ---------------------- CONTACT ----------------------
-def contact_page(request):
+async def contact_page(request):
     if request.method == "POST":
-        ContactMessage.objects.create(
+        contact_message = ContactMessage(
             name=request.POST.get('name'),
             email=request.POST.get('email'),
             subject=request.POST.get('subject'),
             message=request.POST.get('message')
         )
+        # one bad row would fail the whole buffered bulk_create, so check it now
+        try:
+            contact_message.full_clean()
+        except ValidationError:
+            messages.error(request, "Please fill in every field with a valid email.")
+            return redirect("food:contact")
+        await contact_buffer.aadd(contact_message)
         messages.success(request, "Your Message was sent Successfully")
         return redirect("food:main")
-    return render(request, 'food/contact.html')
+    # the header reads request.user, which loads the session synchronously
+    return await sync_to_async(render)(request, 'food/contact.html')
 
 
 # ---------------------- GALLERY ----------------------
@@ -258,6 +465,12 @@ def add_gallery(request):
             messages.error(request, "Both image and caption are required.")
             return redirect('food:add_gallery')
 
+        try:
+            forms.ImageField().clean(image)
+        except ValidationError:
+            messages.error(request, "Please upload a valid image file.")
+            return redirect('food:add_gallery')
+
         Gallery.objects.create(image=image, price=price, caption=caption)
         messages.success(request, "Image Added Successfully")
         return redirect('food:admin_dashboard')
@@ -295,7 +508,7 @@ def gallery_order_page(request, item_id):
             quantity = 1
 
         # ✅ Create the order entry in database
-        order = GalleryOrder.objects.create(
+        order = Order.objects.create(
             user=request.user,
             gallery_item=gallery_item,
             quantity=quantity,
@@ -316,42 +529,29 @@ def gallery_order_page(request, item_id):
 # ---------------------- CHECKOUT & PAYMENT ----------------------
 @login_required(login_url='food:login')
 def checkout(request):
-    food_orders = Order.objects.filter(user=request.user, status='Pending')
-    gallery_orders = GalleryOrder.objects.filter(user=request.user, status='Pending')
-
-    total = sum(o.item.price * o.quantity for o in food_orders) + \
-            sum(g.gallery_item.price * g.quantity for g in gallery_orders)
+    cart = get_cart(request.user)
 
-    if not food_orders.exists() and not gallery_orders.exists():
+    if not cart:
         messages.info(request, "Your cart is empty.")
         return redirect('food:main')
 
     if request.method == "POST":
-        request.session['checkout_total'] = float(total)
         return redirect('food:payment')
 
     return render(request, 'food/checkout.html', {
-        'food_orders': food_orders,
-        'gallery_orders': gallery_orders,
-        'total': total
+        'orders': cart.lines,
+        'total': cart.total
     })
 
 
 @login_required(login_url='food:login')
 def payment(request):
-    food_orders = Order.objects.filter(user=request.user, status='Pending')
-    gallery_orders = GalleryOrder.objects.filter(user=request.user, status='Pending')
-    total = request.session.get('checkout_total', 0)
-
-    if not food_orders.exists() and not gallery_orders.exists():
-        messages.info(request, "No items to pay for.")
-        return redirect('food:main')
-
     if request.method == "POST":
         data = request.POST
 
-        Payments.objects.create(
-            user=request.user,
+        # the amount is computed from the locked rows, never taken from the request
+        paid = settle_cart(
+            request.user,
             first_name=data.get('first_name'),
             last_name=data.get('last_name'),
             address=data.get('address'),
@@ -363,32 +563,106 @@ def payment(request):
             card_number=data.get('card_number'),
             expiration_date=data.get('expiration_date'),
             cvv=data.get('cvv'),
-            amount=total
         )
-
-        for o in food_orders:
-            o.status = 'Completed'
-            o.save()
-
-        for g in gallery_orders:
-            g.status = 'Completed'
-            g.save()
+        if paid is None:
+            messages.info(request, "No items to pay for.")
+            return redirect('food:main')
 
         messages.success(request, "✅ Payment successful! Your order is now complete.")
         return redirect('food:order_success')
 
-    return render(request, 'food/payment.html', {'total': total})
+    cart = get_cart(request.user)
+    if not cart:
+        messages.info(request, "No items to pay for.")
+        return redirect('food:main')
+
+    return render(request, 'food/payment.html', {'total': cart.total})
 
 
 def order_sucess(request): 
     return render(request,'food/order_success.html')
 
-def feedback(request):
+@login_required(login_url='food:login')
+async def feedback(request):
+    user = await request.auser()
     if request.method == "POST":
         message = request.POST.get('message')
         rating = request.POST.get('rating')
-        FeedBack.objects.create(user = request.user,message = message ,rating = rating)
+        feedback = FeedBack(user = user,message = message ,rating = rating)
+        try:
+            feedback.full_clean(exclude=['user'])
+        except ValidationError:
+            messages.error(request, "Please write a message and pick a rating.")
+            return redirect('food:feedback')
+        await feedback_buffer.aadd(feedback)
         messages.success(request,"Thank You For Your Feed Back ")
         return redirect('food:main')
-    feedbacks = FeedBack.objects.filter(user = request.user).order_by('-created_at')
-    return render(request,'food/feedback.html',{'feedbacks':feedbacks})
\ No newline at end of file
+    feedbacks = [fb async for fb in FeedBack.objects.filter(user = user).order_by('-created_at')]
+    return await sync_to_async(render)(request,'food/feedback.html',{'feedbacks':feedbacks})
+
+
+# ---------------------- CATALOG API ----------------------
+API_PAGE_LIMIT = 50
+API_MAX_LIMIT = 200
+
+
+def _catalog_page(request, queryset, serializer):
+    try:
+        cursor = int(request.GET.get('cursor', 0))
+        limit = min(max(int(request.GET.get('limit', API_PAGE_LIMIT)), 1), API_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': "cursor and limit must be integers."}, status=400)
+
+    rows, next_cursor = cursor_slice(queryset, cursor, limit)
+    return JsonResponse({
+        'results': [serializer(row, request) for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=lambda request: catalog_etag('menu', request),
+           last_modified_func=lambda request: catalog_last_modified('menu', request))
+def api_menu(request):
+    food_items = FoodItem.objects.all()
+    category = request.GET.get('category')
+    if category:
+        if category not in dict(FoodItem.CATEGORY_CHOICE):
+            return JsonResponse({'error': f"Unknown category '{category}'."}, status=400)
+        food_items = food_items.filter(category=category)
+    return _catalog_page(request, food_items, serialize_food_item)
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=lambda request: catalog_etag('gallery', request),
+           last_modified_func=lambda request: catalog_last_modified('gallery', request))
+def api_gallery(request):
+    return _catalog_page(request, Gallery.objects.all(), serialize_gallery_image)
+
+
+@require_safe
+def api_search(request):
+    category = request.GET.get('category') or None
+    if category and category not in dict(FoodItem.CATEGORY_CHOICE):
+        return JsonResponse({'error': f"Unknown category '{category}'."}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', API_PAGE_LIMIT)), 1), API_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': "limit must be an integer."}, status=400)
+
+    items, facets = search_menu(request.GET.get('q', ''), category=category, limit=limit)
+    return JsonResponse({
+        'results': [dict(serialize_food_item(item, request), score=item.search_score) for item in items],
+        'facets': facets,
+    })
+
+
+@require_safe
+def api_ratings(request):
+    """Feedback rating averages read from the counters, plus the caller's own when logged in."""
+    data = {'overall': rating_summary()}
+    if request.user.is_authenticated:
+        data['mine'] = rating_summary('user', request.user.pk)
+    return JsonResponse(data)
@@ -9,8 +9,26 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import sync_to_async
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from food.buffers import flush_all  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    # Django does not speak the lifespan protocol; handle it here so buffered
+    # contact/feedback rows are written before the server shuts down.
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await sync_to_async(flush_all)()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    return await django_application(scope, receive, send)